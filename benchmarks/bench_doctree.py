@@ -0,0 +1,33 @@
+"""
+Benchmark building docutils nodes directly against the text round trip.
+
+Compares ``to_document()`` with ``dump()`` followed by docutils'
+``publish_doctree``, which is what handing generated text to
+``nested_parse`` amounts to.
+
+Run it from the repository root with::
+
+    python benchmarks/bench_doctree.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docutils.core import publish_doctree  # noqa
+
+from bench_html import build, best  # noqa
+from pyposo.doctree import to_document  # noqa
+
+
+def main():
+    document = build()
+    for name, function in (
+        ("to_document()", lambda: to_document(document)),
+        ("dump() + parse", lambda: publish_doctree(document.dump())),
+    ):
+        print(f"{name:<20}{best(function) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
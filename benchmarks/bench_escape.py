@@ -0,0 +1,58 @@
+"""
+Benchmark the cost of escaping markup while constructing documents.
+
+Builds the same document of paragraphs three times, without escaping,
+inside of ``escape_markup()`` and with a batch ``escape_text()`` afterwards,
+and prints how much escaping adds to the construction time.
+
+Run it from the repository root with::
+
+    python benchmarks/bench_escape.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyposo import Document, Paragraph, escape_markup, escape_text  # noqa
+
+TEXT = (
+    "Some user supplied text with a snake_case name, a *star*, a `literal` "
+    "and a |substitution| in it, followed by plain words to fill the line. "
+)
+PARAGRAPHS = 2000
+REPEAT = 5
+
+
+def build():
+    return Document(*(Paragraph(TEXT) for _ in range(PARAGRAPHS)))
+
+
+def build_escaped():
+    with escape_markup():
+        return build()
+
+
+def build_batch_escaped():
+    return escape_text(build())
+
+
+def best(function):
+    return min(timeit.repeat(function, number=1, repeat=REPEAT))
+
+
+def main():
+    baseline = best(build)
+    print(f"{'plain construction':<28}{baseline * 1000:8.1f} ms")
+    for name, function in (
+        ("inside escape_markup()", build_escaped),
+        ("escape_text() afterwards", build_batch_escaped),
+    ):
+        duration = best(function)
+        overhead = (duration / baseline - 1) * 100
+        print(f"{name:<28}{duration * 1000:8.1f} ms  {overhead:+5.1f} %")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark the garbage collector's share of building and dropping big trees.
+
+Each document is built in a fresh process, with strong or weak parent links
+and with or without `bulk_build`.  Reported are the build time, the time
+spent in collections while building and the time it takes to free the tree
+again (dropping it and running a full collection).
+
+Run it from the repository root with::
+
+    python benchmarks/bench_gc.py
+"""
+from contextlib import ExitStack
+import gc
+from multiprocessing import get_context
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyposo import (  # noqa
+    BulletList,
+    Document,
+    ListItem,
+    Paragraph,
+    Section,
+    bulk_build,
+    weak_parents,
+)
+
+SECTIONS = 500
+ITEMS = 40
+MODES = [
+    ("strong", False, False),
+    ("strong, bulk_build", False, True),
+    ("weak", True, False),
+    ("weak, bulk_build", True, True),
+]
+
+
+def build():
+    document = Document()
+    for i in range(SECTIONS):
+        with document.create(Section(f"Section {i}")):
+            document.append(Paragraph("Some text in the section."))
+            with document.create(BulletList()):
+                for _ in range(ITEMS):
+                    document.append(ListItem(Paragraph("An item.")))
+    return document
+
+
+def run(weak, bulk):
+    pauses = []
+
+    def callback(phase, info):
+        if phase == "start":
+            pauses.append(-time.perf_counter())
+        else:
+            pauses[-1] += time.perf_counter()
+
+    gc.callbacks.append(callback)
+    start = time.perf_counter()
+    with ExitStack() as stack:
+        if weak:
+            stack.enter_context(weak_parents())
+        if bulk:
+            stack.enter_context(bulk_build())
+        document = build()
+    build_time = time.perf_counter() - start
+    gc.callbacks.remove(callback)
+    pause_time = sum(pauses)
+    nodes = document.stats().nodes
+
+    start = time.perf_counter()
+    del document
+    gc.collect()
+    free_time = time.perf_counter() - start
+    return nodes, build_time, pause_time, len(pauses), free_time
+
+
+def main():
+    with get_context("spawn").Pool(1, maxtasksperchild=1) as pool:
+        for name, weak, bulk in MODES:
+            nodes, build_time, pause_time, pauses, free_time = pool.apply(
+                run, (weak, bulk)
+            )
+            print(
+                f"{name:<20}{nodes} nodes: build {build_time * 1000:7.1f} ms, "
+                f"gc {pause_time * 1000:6.1f} ms in {pauses:4} pauses, "
+                f"free {free_time * 1000:6.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark rendering HTML directly against the reStructuredText round trip.
+
+Compares ``dump()``, ``dump_html()`` and, if docutils is installed,
+``dump()`` followed by docutils' HTML writer for the same document.
+
+Run it from the repository root with::
+
+    python benchmarks/bench_html.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyposo import (  # noqa
+    BulletList,
+    Document,
+    Emph,
+    EnumeratedList,
+    EnumeratedListItem,
+    ListItem,
+    Paragraph,
+    Section,
+    Strong,
+)
+from pyposo.html import dump_html  # noqa
+
+SECTIONS = 200
+REPEAT = 3
+
+
+def build():
+    document = Document(textwidth=79)
+    for i in range(SECTIONS):
+        document.append(
+            Section(
+                f"Section {i}",
+                Paragraph(
+                    "Some text with ",
+                    Emph("emphasis"),
+                    " and ",
+                    Strong("strong words"),
+                    " followed by more text to wrap " * 3,
+                ),
+                BulletList(*(ListItem(f"Item {j} of a list") for j in range(5))),
+                EnumeratedList(
+                    *(EnumeratedListItem(f"Step {j}") for j in range(5))
+                ),
+            )
+        )
+    return document
+
+
+def best(function):
+    return min(timeit.repeat(function, number=1, repeat=REPEAT))
+
+
+def main():
+    document = build()
+    timings = [("dump()", best(document.dump))]
+    timings.append(("dump_html()", best(lambda: dump_html(document))))
+
+    try:
+        from docutils.core import publish_parts
+    except ImportError:
+        print("docutils isn't installed, skipping the round trip.\n")
+    else:
+        timings.append(
+            (
+                "dump() + docutils",
+                best(
+                    lambda: publish_parts(document.dump(), writer_name="html")
+                ),
+            )
+        )
+
+    for name, duration in timings:
+        print(f"{name:<20}{duration * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
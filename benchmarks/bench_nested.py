@@ -0,0 +1,47 @@
+"""
+Benchmark rendering deeply nested lists.
+
+Every document has about the same number of paragraphs, nested to different
+depths.  Since every element is rendered once at its final indent, the time
+per character of output should stay about the same for all depths.
+
+Run it from the repository root with::
+
+    python benchmarks/bench_nested.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyposo import BulletList, Document, ListItem, Paragraph  # noqa
+
+PARAGRAPHS = 2000
+DEPTHS = [1, 4, 16, 32]
+REPEAT = 3
+TEXT = "A paragraph of an API reference which is long enough to be wrapped. " * 2
+
+
+def nested_list(depth, paragraphs):
+    width = paragraphs // depth
+    list_ = BulletList(*(ListItem(Paragraph(TEXT)) for _ in range(width)))
+    for _ in range(depth - 1):
+        items = [ListItem(Paragraph(TEXT)) for _ in range(width - 1)]
+        list_ = BulletList(*items, ListItem(Paragraph(TEXT), list_))
+    return list_
+
+
+def main():
+    for depth in DEPTHS:
+        document = Document(nested_list(depth, PARAGRAPHS), textwidth=200)
+        size = len(document.dump())
+        duration = min(timeit.repeat(document.dump, number=1, repeat=REPEAT))
+        print(
+            f"depth {depth:>3}: {duration * 1000:8.1f} ms, "
+            f"{duration * 1e9 / size:6.1f} ns per character"
+        )
+
+
+if __name__ == "__main__":
+    main()
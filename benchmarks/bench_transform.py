@@ -0,0 +1,85 @@
+"""
+Benchmark running filters over a document.
+
+All filters given to one `transform` call run in a single walk, so five
+filters should cost about the same as one, and much less than five calls
+with one filter each.
+
+Run it from the repository root with::
+
+    python benchmarks/bench_transform.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyposo import (  # noqa
+    Document,
+    Emph,
+    Paragraph,
+    Section,
+    Str,
+    Subsection,
+    applies_to,
+)
+
+SECTIONS = 200
+PARAGRAPHS = 20
+REPEAT = 3
+
+
+def document():
+    sections = []
+    for i in range(SECTIONS):
+        section = Subsection if i % 2 else Section
+        paragraphs = [
+            Paragraph("Some text with", Emph("emphasis"), "in it.")
+            for _ in range(PARAGRAPHS)
+        ]
+        sections.append(section(f"Section {i}", *paragraphs))
+    return Document(*sections)
+
+
+@applies_to(Str)
+def keep_str(str_):
+    return None
+
+
+@applies_to(Emph)
+def keep_emph(emph):
+    return None
+
+
+@applies_to(Subsection)
+def keep_subsection(subsection):
+    return None
+
+
+@applies_to(Paragraph)
+def keep_paragraph(paragraph):
+    return None
+
+
+def keep_all(element):
+    return None
+
+
+FILTERS = [keep_str, keep_emph, keep_subsection, keep_paragraph, keep_all]
+
+
+def main():
+    doc = document()
+    runs = {
+        "1 filter": lambda: doc.transform(keep_all),
+        "5 filters, 1 walk": lambda: doc.transform(*FILTERS),
+        "5 filters, 5 walks": lambda: [doc.transform(f) for f in FILTERS],
+    }
+    for name, run in runs.items():
+        duration = min(timeit.repeat(run, number=1, repeat=REPEAT))
+        print(f"{name:<20}{duration * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
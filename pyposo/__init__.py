@@ -10,27 +10,41 @@ I created it for another project in which I hope to use this one since I
 didn't find any good python library for this job. If there is one,
 please let me know!
 """
-from .containers import ListContainer
-from .base import Element, Inline, Block
+from .containers import ListContainer, weak_parents
+from .base import Element, Inline, Block, bulk_build
 from .elements import (
     Document,
+    StreamingDocument,
     Space,
     LineBreak,
     Str,
     Paragraph,
+    StreamParagraph,
     Plain,
+    LiteralBlock,
+    CodeBlock,
     Title,
     Section,
     Subsection,
     Subsubsection,
     Emph,
     Strong,
+    Target,
+    Reference,
+    Contents,
+    UnresolvedReferenceWarning,
     BulletList,
     ListItem,
     EnumeratedList,
     EnumeratedListItem,
     FieldList,
     FieldListItem,
+    escape_markup,
+    escape_text,
 )
+from .output import write_documents, Manifest
+from .cache import use_cache, MemoryCache, DiskCache
+from .html import dump_html
+from .transform import applies_to
 
 from .version import __version__
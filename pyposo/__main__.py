@@ -0,0 +1,161 @@
+"""
+Render JSON or YAML document specs to reStructuredText files::
+
+    python -m pyposo specs/*.json --output-dir build --jobs 8
+
+See :mod:`pyposo.spec` for the format of the specs.  Documents whose
+fingerprint didn't change since the last run, including the files they
+read, and whose file wasn't touched since, are skipped; see
+:func:`pyposo.output.write_documents`.
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import os
+from pathlib import Path
+import sys
+import time
+
+from .output import Manifest, _hash_bytes, _write_if_changed
+from .spec import from_spec, load_specs
+from .version import __version__
+
+
+def _output_path(spec_path, spec, number, count, output_dir):
+    if "output" in spec:
+        name = spec["output"]
+    elif count == 1:
+        name = f"{spec_path.stem}.rst"
+    else:
+        name = f"{spec_path.stem}-{number}.rst"
+
+    directory = spec_path.parent if output_dir is None else output_dir
+    return directory / name
+
+
+def _render(spec, path, known_hash):
+    start = time.perf_counter()
+    data = from_spec(spec).dump().encode("utf-8")
+    output_hash = _hash_bytes(data)
+    written = _write_if_changed(path, data, output_hash, known_hash)
+    return written, output_hash, time.perf_counter() - start
+
+
+def _jobs(args, manifest, report):
+    for spec_path in map(Path, args.specs):
+        specs = load_specs(spec_path)
+        for number, spec in enumerate(specs, 1):
+            path = _output_path(
+                spec_path, spec, number, len(specs), args.output_dir
+            )
+            # The spec doesn't change when files it refers to do, so the
+            # document is built to compare its fingerprint.
+            try:
+                document = from_spec(spec)
+            except Exception as error:
+                report("failed", f"{path}: {error}", 0)
+                continue
+            input_hash = f"{__version__}:{document.fingerprint()}"
+
+            entry = manifest.entries.get(str(path))
+            is_current = manifest.is_current(path)
+            if not args.force and is_current and entry["input"] == input_hash:
+                report("skipped", path, 0)
+                continue
+
+            known_hash = entry["output"] if is_current else None
+            yield spec, path, input_hash, known_hash
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m pyposo",
+        description="Render JSON or YAML document specs to .rst files.",
+    )
+    parser.add_argument("specs", nargs="+", help="JSON or YAML spec files")
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        type=Path,
+        help="where to write the files (default: next to each spec)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="number of worker processes (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--manifest",
+        type=Path,
+        default=Path(".pyposo-manifest.json"),
+        help="file keeping track of written files "
+        "(default: .pyposo-manifest.json)",
+    )
+    parser.add_argument(
+        "-f", "--force", action="store_true", help="render all documents"
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="only print a summary"
+    )
+    args = parser.parse_args(argv)
+
+    manifest = Manifest(args.manifest)
+    counts = {"written": 0, "unchanged": 0, "skipped": 0, "failed": 0}
+    start = time.perf_counter()
+
+    def report(status, path, seconds):
+        counts[status] += 1
+        if not args.quiet:
+            print(f"{status:<10}{seconds * 1000:9.1f} ms  {path}", flush=True)
+
+    def finish(path, input_hash, result):
+        written, output_hash, seconds = result
+        manifest.update(path, input_hash, output_hash)
+        report("written" if written else "unchanged", path, seconds)
+
+    try:
+        if args.jobs == 1:
+            for spec, path, input_hash, known_hash in _jobs(
+                args, manifest, report
+            ):
+                try:
+                    result = _render(spec, path, known_hash)
+                except Exception as error:
+                    report("failed", f"{path}: {error}", 0)
+                else:
+                    finish(path, input_hash, result)
+        else:
+            with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+                futures = {
+                    executor.submit(_render, spec, path, known_hash): (
+                        path,
+                        input_hash,
+                    )
+                    for spec, path, input_hash, known_hash in _jobs(
+                        args, manifest, report
+                    )
+                }
+                for future in as_completed(futures):
+                    path, input_hash = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as error:
+                        report("failed", f"{path}: {error}", 0)
+                    else:
+                        finish(path, input_hash, result)
+    finally:
+        manifest.save()
+
+    print(
+        "{written} written, {unchanged} unchanged, {skipped} skipped, "
+        "{failed} failed in {seconds:.2f} s".format(
+            seconds=time.perf_counter() - start, **counts
+        ),
+        file=sys.stderr,
+    )
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,22 +2,101 @@
 Base Elements
 =============
 """
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+import contextvars
+from functools import partial
+import gc
+from string import Formatter
+
+from .cache import _digest_tree, cached_render
+from .frozen import freeze
+from .stats import tree_stats
+from .transform import transform
+from . import containers
+from .containers import ListContainer, _use_parent_slot, attach
+
+# Maps ``id(element)`` to the stack of `_BuildFrame` objects of every element
+# which is currently used with :meth:`Element.create`.  The mapping is never
+# mutated, each ``create`` sets a new one, so that every thread and every
+# context has its own builder state.
+_build_states = contextvars.ContextVar("pyposo_build_states", default={})
+_formatter = Formatter()
+
+
+class _BuildFrame:
+    __slots__ = ["container", "append_queue"]
+
+    def __init__(self, container):
+        self.container = container
+        self.append_queue = []
+
+
+@contextmanager
+def bulk_build(freeze=False):
+    """Pause the cyclic garbage collector while building a large tree.
+
+    Every element is a container object, so building a big tree triggers
+    many collections which scan more and more of it.  Inside the block the
+    collector is disabled (for the whole process, not just this thread) and
+    it is enabled again when the block is left, if it was enabled before.
+
+    :param freeze: Move everything alive at the end of the block to the
+        permanent generation with :func:`gc.freeze`, so later collections
+        skip the tree.  Only use this for trees which live until the
+        process ends, frozen objects are never collected.
+    :type freeze: bool
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if freeze:
+            gc.freeze()
+        if enabled:
+            gc.enable()
+
 
-from .containers import ListContainer
+def _run_in_copied_context(context, builder):
+    # Workers get the settings of the caller, but not its create blocks.
+    context = context.copy()
+    context.run(_build_states.set, {})
+    return context.run(builder)
 
 
 def _create_child_properties(child_name):
     def get_child(self):
+        if child_name == self._main_container:
+            states = _build_states.get()
+            if states:
+                frames = states.get(id(self))
+                if frames:
+                    return frames[-1].container
         return getattr(self, f"_{child_name}")
 
     def set_child(self, value):
-        child = getattr(self, child_name)
-        oktypes = child.oktypes
-        value = value.list if isinstance(value, ListContainer) else list(value)
+        child = getattr(self, f"_{child_name}")
+        if containers._active_indexes:
+            child._removed(child.list)
+
         list_container = ListContainer(
-            *value, oktypes=oktypes, parent=self, location=child_name
+            oktypes=child.oktypes,
+            parent=self,
+            location=child_name,
+            converter=child.converter,
         )
+        is_checked = isinstance(value, ListContainer) and (
+            list_container._accepts_checked(value)
+        )
+        if is_checked:
+            list_container.list = value.list.copy()
+            for element in list_container:
+                attach(element, self, child_name)
+            if containers._active_indexes:
+                list_container._added(list_container.list)
+        else:
+            list_container.extend(value)
         setattr(self, f"_{child_name}", list_container)
 
     def _set_child(self, value, oktypes, converter=None):
@@ -52,17 +131,52 @@ class _MetaElement(type):
 
 class Element(metaclass=_MetaElement):
     __slots__ = [
-        "parent",
+        "_parent",
         "location",
-        "_root_container",
-        "_prev_containers",
-        "_append_queue",
+        "__weakref__",
     ]
     _children = []
     _main_container = None
+    _cacheable = False
+    # Whether `iter_dump` renders the children one by one, instead of the
+    # whole element at once.
+    _streamed = False
+    _content_indent = 0
+
+    def _enclosing_frames(self):
+        frames = _build_states.get().get(id(self))
+        if frames is None:
+            raise RuntimeError(
+                "This method can only be used inside of a create block."
+            )
+        return frames[:-1]
+
+    @contextmanager
+    def _push_frame(self, container):
+        states = _build_states.get()
+        frames = states.get(id(self))
+        if frames is None:
+            frames = (_BuildFrame(getattr(self, f"_{self._main_container}")),)
+
+        token = _build_states.set(
+            {**states, id(self): frames + (_BuildFrame(container),)}
+        )
+        try:
+            yield frames
+        finally:
+            _build_states.reset(token)
 
     @contextmanager
     def create(self, child):
+        """Append to `child` instead of this element inside the block.
+
+        Every call of `append` (and the other `ListContainer` methods) on
+        this element inside the ``with`` block ends up in `child`, which is
+        appended to this element once the block is left.
+
+        The builder state is stored per thread and per context, so several
+        threads can build different parts of a document at the same time.
+        """
         is_valid_child = not (
             self._main_container is None or child._main_container is None
         )
@@ -75,44 +189,131 @@ class Element(metaclass=_MetaElement):
                 "contaxtmanagers or Children."
             )
 
-        prev_containers = getattr(self, "_prev_containers", [])
-        self._prev_containers = prev_containers
-
-        prev_containers.append(getattr(self, self._main_container))
-
-        new_container = getattr(child, child._main_container)
+        with self._push_frame(getattr(child, child._main_container)) as frames:
+            yield child
 
-        setattr(self, f"_{self._main_container}", new_container)
+        self.append(child)
 
-        yield child
+        append_queue = frames[-1].append_queue
+        while append_queue:
+            self.append(append_queue.pop(0))
 
-        setattr(self, f"_{self._main_container}", prev_containers.pop())
-        self.append(child)
+        self._child_created(child, len(frames) - 1)
 
-        append_queue = getattr(self, "_append_queue", {})
-        self._append_queue = append_queue
+    def _child_created(self, child, level):
+        """Called once a create block is left and its queue is drained.
 
-        for object_ in append_queue.get(len(prev_containers), []):
-            self.append(object_)
+        :param level: The number of enclosing create blocks, ``0`` if
+            `child` was appended to this element itself.
+        """
 
     @contextmanager
     def root(self, index=0):
-        new_container = self._prev_containers[index]
-        self._prev_containers.append(getattr(self, self._main_container))
-
-        setattr(self, f"_{self._main_container}", new_container)
+        """Temporarily append to the container of an enclosing create block.
 
-        yield new_container.parent
+        :param index: The level of the create block, ``0`` is this element.
+        :type index: int
+        """
+        new_container = self._enclosing_frames()[index].container
 
-        setattr(self, f"_{self._main_container}", self._prev_containers.pop())
+        with self._push_frame(new_container):
+            yield new_container.parent
 
     def append_later(self, object_, index=0):
-        append_queue = getattr(self, "_append_queue", {})
-        self._append_queue = append_queue
-        if index < 0:
-            index = len(self._prev_containers) + index
-
-        append_queue.setdefault(index, []).append(object_)
+        """Append `object_` once the create block at level `index` is left.
+
+        :param index: The level of the create block, ``0`` is this element.
+        :type index: int
+        """
+        self._enclosing_frames()[index].append_queue.append(object_)
+
+    def extend_concurrently(self, *builders, max_workers=None):
+        """Build children in worker threads and append them in order.
+
+        Each builder is a callable without arguments which returns the child
+        it built.  They run in a thread pool, each in a copy of the caller's
+        context without its `create` blocks, so that settings like
+        `escape_markup<pyposo.elements.escape_markup>` apply and builders can
+        use `create` on their own elements.  The results are appended in the
+        order of `builders` no matter which finishes first.
+
+        :param max_workers: Passed on to
+            :class:`concurrent.futures.ThreadPoolExecutor`.
+        :returns: The list of built children.
+        """
+        run = partial(_run_in_copied_context, contextvars.copy_context())
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            children = list(executor.map(run, builders))
+
+        self.extend(children)
+        return children
+
+    def _fingerprint_fields(self):
+        """Return the attributes, besides children, which affect rendering."""
+        return ()
+
+    def _render_context(self):
+        """Return what, besides the position in the tree, affects rendering.
+
+        This is for values which are assigned by the parent while rendering.
+        """
+        return ()
+
+    def fingerprint(self):
+        """Return a hash of this element and all of its children.
+
+        Two elements have the same fingerprint if they have the same type,
+        the same attributes (see `_fingerprint_fields`) and children with
+        the same fingerprints, no matter where they are in a document.
+
+        :rtype: str
+        """
+        return _digest_tree(self, {}).hex()
+
+    def walk(self):
+        """Iterate over this element and all elements below it.
+
+        Elements come in document order, parents before their children.
+        The tree is walked without recursion, so arbitrarily deep trees are
+        fine, but it mustn't be modified while walking it.
+        """
+        stack = [self]
+        while stack:
+            element = stack.pop()
+            yield element
+            for name in reversed(element._children):
+                stack.extend(reversed(getattr(element, f"_{name}").list))
+
+    def stats(self, largest=10):
+        """Return the size and structure of this element and its children.
+
+        Counts the elements per class and the bytes of text, finds the
+        deepest elements and the `largest` containers and estimates the
+        memory used, in one pass without recursion.
+
+        :param largest: How many of the largest containers to report.
+        :type largest: int
+        :rtype: `TreeStats<pyposo.stats.TreeStats>`
+        """
+        return tree_stats(self, largest)
+
+    def freeze(self):
+        """Return an immutable snapshot of this element and its children.
+
+        Edits of the snapshot return new snapshots which share everything
+        that wasn't changed, see `pyposo.frozen`.
+
+        :rtype: `FrozenElement<pyposo.frozen.FrozenElement>`
+        """
+        return freeze(self)
+
+    def transform(self, *filters):
+        """Run `filters` over all elements below this one, in one walk.
+
+        Filters replace or delete elements by returning replacements, see
+        `pyposo.transform`.  The tree is changed in place.
+        """
+        transform(self, *filters)
 
     def _repr_children(self):
         if len(self._children) == 1:
@@ -142,10 +343,82 @@ class Element(metaclass=_MetaElement):
             )
 
     def dump(self):
+        return cached_render(self, "rst", self._dump)
+
+    def _dump(self):
         return self.format_string.format(
             **{child: self._render_child(child) for child in self._children}
         )
 
+    def iter_dump(self):
+        """Render this element lazily, piece by piece.
+
+        The pieces joined are what `dump` returns, lists, directives,
+        sections and documents render one child after the other though, so
+        stopping early skips the rest.  The element is rendered in the
+        context of its document, with the same indent, width and leading
+        newline as in the whole document.  References aren't checked and
+        the render cache is only used for the elements which are rendered
+        as a whole.
+
+        :rtype: iterator of str
+        """
+        if not self._streamed:
+            yield self.dump()
+            return
+
+        for literal, child, _, _ in _formatter.parse(self.format_string):
+            if literal:
+                yield literal
+            if child is not None:
+                yield from self._iter_child(child)
+
+    def _iter_child(self, child):
+        if hasattr(self, f"_iter_{child}"):
+            yield from getattr(self, f"_iter_{child}")()
+        elif hasattr(self, f"_render_{child}"):
+            yield getattr(self, f"_render_{child}")()
+        else:
+            yield from self._iter_children(child)
+
+    def _iter_children(self, child):
+        seperator = getattr(self, f"_{child}_seperator", "")
+        for index, element in enumerate(getattr(self, child)):
+            if index and seperator:
+                yield seperator
+            yield from element.iter_dump()
+
+    def dump_partial(self, lines=None, chars=None):
+        """Render the beginning of this element, as `dump` would.
+
+        Only as much of the element is rendered as is needed for the
+        requested part, see `iter_dump`.
+
+        :param lines: Stop after this many lines.
+        :type lines: int
+        :param chars: Stop after this many characters.
+        :type chars: int
+        :rtype: str
+        """
+        pieces = []
+        length = 0
+        newlines = 0
+        for piece in self.iter_dump():
+            pieces.append(piece)
+            length += len(piece)
+            newlines += piece.count("\n")
+            if (chars is not None and length >= chars) or (
+                lines is not None and newlines >= lines
+            ):
+                break
+
+        text = "".join(pieces)
+        if lines is not None:
+            text = "\n".join(text.split("\n", lines)[:lines])
+        if chars is not None:
+            text = text[:chars]
+        return text
+
     @property
     def format_string(self):
         return "".join(f"{{{c}}}" for c in self._children)
@@ -168,7 +441,7 @@ class Element(metaclass=_MetaElement):
         elif self.location is None:
             return self.parent.content
         else:
-            return getattr(self.parent, self.location)
+            return getattr(self.parent, f"_{self.location}")
 
     @property
     def index(self):
@@ -183,10 +456,46 @@ class Element(metaclass=_MetaElement):
 
         return index
 
+    @property
+    def is_first(self):
+        """Whether this element is the first element of its container.
+
+        This is ``None`` for elements without a container.  Unlike
+        ``index == 0`` it doesn't search the container.
+        """
+        container = self.container
+        if container is None:
+            return None
+        return len(container) > 0 and container[0] is self
+
     @property
     def textwidth(self):
         return getattr(self.document, "textwidth", None)
 
+    @property
+    def indent(self):
+        """The number of columns the lines of this element are indented by.
+
+        Elements are rendered at their final indent, the lists and
+        directives they are part of only join them.
+        """
+        indent = 0
+        parent = self.parent
+        while parent is not None:
+            indent += parent._content_indent
+            parent = parent.parent
+        return indent
+
+    def _indent_lines(self, text):
+        """Indent all lines of `text` which aren't empty by `indent`."""
+        indent = self.indent
+        if not indent:
+            return text
+        prefix = " " * indent
+        return "\n".join(
+            prefix + line if line else line for line in text.split("\n")
+        )
+
     def offset(self, offset):
         own_index = self.container.index(self)
         container = self.container
@@ -215,6 +524,9 @@ class Element(metaclass=_MetaElement):
         raise AttributeError(f"No attribute: {name!r}")
 
 
+_use_parent_slot(Element)
+
+
 class Inline(Element):
     __slots__ = []
 
@@ -226,3 +538,4 @@ class Block(Element):
     """
     __slots__ = ["_indent"]
     _main_container = "content"
+    _cacheable = True
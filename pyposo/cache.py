@@ -0,0 +1,201 @@
+"""
+Render Cache
+============
+
+Content addressed caching of rendered elements.
+
+Every element which is rendered while a cache is in use (see `use_cache`)
+is looked up by a key made of its structure (its type, render-affecting
+attributes and children) and the context it is rendered in (textwidth,
+indent, parent and whether it's the first of its siblings).  Equal subtrees
+are therefore only rendered once, across documents and, with a `DiskCache`,
+across processes and runs.
+
+Caches are objects with a ``get(key)`` method, returning ``None`` for
+unknown keys, and a ``set(key, text)`` method.
+"""
+from collections import OrderedDict
+from contextlib import contextmanager
+import contextvars
+import hashlib
+from pathlib import Path
+import threading
+
+from .output import _write_atomically
+from .version import __version__
+
+_render_cache = contextvars.ContextVar("pyposo_render_cache", default=None)
+# The digests of all elements of the tree which is currently rendered; set by
+# the outermost cached render so that every subtree is only hashed once.
+_render_memo = contextvars.ContextVar("pyposo_render_memo", default=None)
+# Called with every element whose rendering is skipped because of a cache
+# hit, for renderers which have to know about all elements of a document
+# (e.g. to resolve references).
+_cache_hit_callback = contextvars.ContextVar(
+    "pyposo_cache_hit_callback", default=None
+)
+
+
+def _digest_tree(element, memo):
+    """Digest `element` and every element below it, without recursion.
+
+    The digests of all visited elements are stored in `memo` by their id,
+    so that digests of subtrees can be looked up afterwards.
+    """
+    # Parents come before their children in `order`, so walking it backwards
+    # digests all children before their parents.
+    order = []
+    stack = [element]
+    while stack:
+        e = stack.pop()
+        if id(e) not in memo:
+            order.append(e)
+            for name in e._children:
+                stack.extend(getattr(e, f"_{name}").list)
+
+    blake2b = hashlib.blake2b
+    for e in reversed(order):
+        data = f"{type(e).__name__}\0{e._fingerprint_fields()!r}".encode()
+        for name in e._children:
+            children = getattr(e, f"_{name}").list
+            data += b"".join([name.encode(), *[memo[id(c)] for c in children]])
+        memo[id(e)] = blake2b(data, digest_size=16).digest()
+
+    return memo[id(element)]
+
+
+def _cache_key(element, backend, memo):
+    context = (
+        backend,
+        __version__,
+        element.textwidth,
+        element.indent,
+        element.is_first,
+        type(element.parent).__name__,
+        element._render_context(),
+    )
+
+    key = hashlib.blake2b(digest_size=20)
+    key.update(memo.get(id(element)) or _digest_tree(element, memo))
+    key.update(repr(context).encode())
+    return key.hexdigest()
+
+
+def cached_render(element, backend, render):
+    """Return ``render()``, or what it returned before for an equal element.
+
+    Without a cache in use, `render` is simply called.
+
+    :param backend: The name of the output format, it is part of the key.
+    :type backend: str
+    :param render: Renders `element` if it isn't found in the cache.
+    :type render: callable
+    """
+    cache = _render_cache.get()
+    if cache is None or not element._cacheable:
+        return render()
+
+    memo = _render_memo.get()
+    token = None
+    if memo is None:
+        memo = {}
+        token = _render_memo.set(memo)
+
+    try:
+        key = _cache_key(element, backend, memo)
+        text = cache.get(key)
+        if text is None:
+            text = render()
+            cache.set(key, text)
+        else:
+            callback = _cache_hit_callback.get()
+            if callback is not None:
+                callback(element)
+        return text
+    finally:
+        if token is not None:
+            _render_memo.reset(token)
+
+
+@contextmanager
+def use_cache(cache):
+    """Use `cache` for everything rendered inside of the ``with`` block.
+
+    The tree mustn't be modified while it is being rendered.
+
+    :param cache: E.g. a `MemoryCache` or a `DiskCache`.
+    """
+    token = _render_cache.set(cache)
+    try:
+        yield cache
+    finally:
+        _render_cache.reset(token)
+
+
+class MemoryCache:
+    """A least recently used cache in memory.
+
+    :param max_size: The number of characters the cache may hold before the
+        least recently used entries are evicted.
+    :type max_size: int
+    """
+
+    def __init__(self, max_size=2 ** 26):
+        self.max_size = max_size
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+            return text
+
+    def set(self, key, text):
+        if len(text) > self.max_size:
+            return
+
+        with self._lock:
+            old_text = self._entries.pop(key, None)
+            if old_text is not None:
+                self.size -= len(old_text)
+
+            self._entries[key] = text
+            self.size += len(text)
+            while self.size > self.max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskCache:
+    """A cache in a local directory, which can be shared by processes.
+
+    Entries are written atomically, so concurrent readers and writers never
+    see partial entries.
+
+    :param directory: Where the entries are stored, it is created if it
+        doesn't exist.
+    :type directory: str | pathlib.Path
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def _path(self, key):
+        return self.directory / key[:2] / key
+
+    def get(self, key):
+        try:
+            return self._path(key).read_bytes().decode("utf-8")
+        except FileNotFoundError:
+            return None
+
+    def set(self, key, text):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _write_atomically(path, text.encode("utf-8"))
@@ -2,20 +2,113 @@
 The container class which harbors an Elements children.
 """
 from collections import abc
+from contextlib import contextmanager
+import contextvars
+from itertools import islice
+from weakref import ref
+
 from .utils import check_type
 
+# The number of enabled element indexes (see `pyposo.index`).  As long as it
+# is zero, mutations of containers don't even look for an index.
+_active_indexes = 0
+_weak_parents = contextvars.ContextVar("pyposo_weak_parents", default=False)
+# The classes whose ``parent`` is their ``_parent`` slot, as long as weak
+# parents were never used.
+_parent_slots = []
+
+
+@contextmanager
+def weak_parents(enabled=True):
+    """Link elements to their parents with weak references inside the block.
+
+    Normally every element and container holds its parent, so a tree is one
+    big reference cycle which only the cyclic garbage collector can free.
+    Trees built inside the block hold their parents weakly instead, so they
+    are freed by reference counting as soon as the root isn't used anymore.
+    In turn, the root has to be kept alive as long as its elements are used:
+    the ``parent`` of an element whose parent was freed is ``None``.
+
+    Until the block is used for the first time, ``parent`` is a plain
+    attribute, afterwards it's a property which resolves weak links, so
+    processes which never use weak parents don't pay for them.
+
+    :param enabled: Pass ``False`` to use strong links again in a nested
+        block.
+    :type enabled: bool
+    """
+    if enabled:
+        _install_parent_properties()
+    token = _weak_parents.set(enabled)
+    try:
+        yield
+    finally:
+        _weak_parents.reset(token)
+
+
+def _parent_property(slot):
+    """Return the ``parent`` property for the parent link stored in `slot`."""
+
+    def get_parent(self):
+        try:
+            parent = slot.__get__(self, type(self))
+        except AttributeError:
+            return None
+        if type(parent) is ref:
+            return parent()
+        return parent
+
+    def set_parent(self, parent):
+        if parent is not None and _weak_parents.get():
+            parent = ref(parent)
+        slot.__set__(self, parent)
+
+    return property(get_parent, set_parent)
+
+
+def _use_parent_slot(cls):
+    """Make the ``_parent`` slot of `cls` its ``parent`` attribute.
+
+    Reading and writing the slot directly is much faster than a property,
+    so the property which handles weak links is only installed (by
+    `_install_parent_properties`) once `weak_parents` is used.
+    """
+    slot = cls.__dict__["_parent"]
+    cls.parent = slot
+    _parent_slots.append((cls, slot))
+
+
+def _install_parent_properties():
+    while _parent_slots:
+        cls, slot = _parent_slots.pop()
+        cls.parent = _parent_property(slot)
+
+
+def _find_index(element):
+    """Return the index of the document `element` is part of, if any."""
+    root = element
+    if root is None:
+        return None
+    while root.parent is not None:
+        root = root.parent
+    if not hasattr(type(root), "_element_index"):
+        return None
+    return root._element_index
+
 
 def attach(element, parent, location):
-    if not isinstance(element, (int, str, bool)):
+    try:
         element.parent = parent
         element.location = location
-    else:
-        print(element, 'has no parent')
+    except AttributeError:
+        # Primitive values (containers with ``oktypes=object``) can't know
+        # their parents.
+        pass
     return element
 
 
 class ListContainer(abc.MutableSequence):
-    __slots__ = ['parent', 'oktypes', 'list', 'location', 'converter']
+    __slots__ = ['_parent', 'oktypes', 'list', 'location', 'converter']
 
     def __init__(self, *elements, oktypes=object, parent=None, location=None,
                  converter=None):
@@ -30,25 +123,106 @@ class ListContainer(abc.MutableSequence):
 
     def __getitem__(self, index):
         if isinstance(index, int):
-            return attach(self.list[index], self.parent, self.location)
+            return self.list[index]
         else:
-            partial_list = self.list.__getitem__(index)
-            new_list_container = ListContainer(
-                *partial_list,
-                oktypes=self.oktypes,
-                parent=self.parent,
-                location=self.location,
-                converter=self.converter,
-            )
-            return new_list_container
+            return ListContainerView(self, index)
 
     def __setitem__(self, index, value):
-        value = self._check_value(value)
+        if isinstance(index, slice):
+            value = [self._check_value(v) for v in value]
+            for v in value:
+                attach(v, self.parent, self.location)
+        else:
+            value = attach(self._check_value(value), self.parent, self.location)
+
+        if _active_indexes:
+            removed = self.list[index]
+            self._removed(removed if isinstance(index, slice) else [removed])
+            self._added(value if isinstance(index, slice) else [value])
         self.list[index] = value
 
     def insert(self, index, value):
         value = self._check_value(value)
-        self.list.insert(index, value)
+        self.list.insert(index, attach(value, self.parent, self.location))
+        if _active_indexes:
+            self._added([value])
+
+    def append(self, value):
+        value = self._check_value(value)
+        self.list.append(attach(value, self.parent, self.location))
+        if _active_indexes:
+            self._added([value])
+
+    def _added(self, values):
+        index = _find_index(self.parent)
+        if index is not None:
+            index._added(self, values)
+
+    def _removed(self, values):
+        index = _find_index(self.parent)
+        if index is not None:
+            index._removed(self, values)
+
+    def extend(self, values):
+        if values is self:
+            values = list(values)
+        for value in values:
+            self.append(value)
+
+    def __iter__(self):
+        return iter(self.list)
+
+    def index(self, value, start=0, stop=None):
+        if stop is None:
+            stop = len(self.list)
+        return self.list.index(value, start, stop)
+
+    def splice(self, other, index=None):
+        """Move all elements of `other` into this container.
+
+        The elements are inserted at `index`, or appended if it is ``None``,
+        and `other` is left empty.  Elements which already passed the type
+        check of `other` aren't checked again if its `oktypes` are a subset
+        of ours, and the list of `other` is reused as is if this container
+        is empty, so merging whole documents doesn't copy or revalidate
+        anything.  Only the parents of the moved elements are updated.
+
+        :param other: The container, or an element whose main container,
+            to take the elements from.
+        :type other: `ListContainer` | `Element<pyposo.base.Element>`
+        :param index: Where to insert the elements.
+        :type index: int
+        """
+        if not isinstance(other, ListContainer):
+            other = getattr(other, other._main_container)
+        if other is self:
+            raise ValueError("Can't splice a container into itself.")
+
+        moved = other.list
+        if _active_indexes:
+            other._removed(moved)
+        if not self._accepts_checked(other):
+            moved = [self._check_value(value) for value in moved]
+        for value in moved:
+            attach(value, self.parent, self.location)
+
+        if index is None:
+            index = len(self.list)
+
+        if not self.list:
+            self.list = moved
+        else:
+            self.list[index:index] = moved
+
+        other.list = list()
+        if _active_indexes:
+            self._added(moved)
+
+    def _accepts_checked(self, other):
+        oktypes = other.oktypes
+        if not isinstance(oktypes, tuple):
+            oktypes = (oktypes,)
+        return all(issubclass(t, self.oktypes) for t in oktypes)
 
     def _check_value(self, value):
         if self.converter is not None:
@@ -57,6 +231,9 @@ class ListContainer(abc.MutableSequence):
         return value
 
     def __delitem__(self, index):
+        if _active_indexes:
+            removed = self.list[index]
+            self._removed(removed if isinstance(index, slice) else [removed])
         del self.list[index]
 
     def __len__(self):
@@ -67,3 +244,116 @@ class ListContainer(abc.MutableSequence):
             name=type(self).__name__,
             content=', '.join(repr(c) for c in self),
         )
+
+
+_use_parent_slot(ListContainer)
+
+
+class ListContainerView(ListContainer):
+    """A slice of a `ListContainer` which shares its elements.
+
+    Slicing a `ListContainer` returns a view instead of checking every
+    element of the slice again.  The view has the same parent and location
+    as the container it was taken from and sees its changes: the slice is
+    applied to the current elements of the container every time, as if it
+    was sliced again.  As soon as the view itself is mutated, or its `list`
+    is accessed, it copies its elements and becomes an ordinary, independent
+    container without parent, so elements added to it aren't attached to
+    the tree.
+    """
+    __slots__ = ['_source', '_slices']
+    _list = ListContainer.list
+
+    # Views aren't part of the tree, so their mutations mustn't show up in
+    # the index of the document.
+    def _added(self, values):
+        pass
+
+    def _removed(self, values):
+        pass
+
+    def __init__(self, container, index):
+        self.oktypes = container.oktypes
+        self.parent = container.parent
+        self.location = container.location
+        self.converter = container.converter
+
+        if isinstance(container, ListContainerView) and (
+            container._source is not None
+        ):
+            self._source = container._source
+            self._slices = container._slices + (index,)
+        else:
+            self._source = container.list
+            self._slices = (index,)
+
+    @property
+    def _range(self):
+        # The indexes of the view in the source, for its current length.
+        range_ = range(len(self._source))
+        for index in self._slices:
+            range_ = range_[index]
+        return range_
+
+    @property
+    def list(self):
+        self._copy()
+        return self._list
+
+    @list.setter
+    def list(self, value):
+        self._list = value
+        self._source = None
+        self._slices = None
+
+    def _copy(self):
+        """Turn the view into an independent container without parent."""
+        if self._source is not None:
+            self.list = [self._source[i] for i in self._range]
+            self.parent = None
+            self.location = None
+
+    # Mutations copy the elements first, so that new elements are attached
+    # to the copy, which has no parent, and not to the source's parent.
+    def __setitem__(self, index, value):
+        self._copy()
+        super().__setitem__(index, value)
+
+    def insert(self, index, value):
+        self._copy()
+        super().insert(index, value)
+
+    def append(self, value):
+        self._copy()
+        super().append(value)
+
+    def splice(self, other, index=None):
+        self._copy()
+        super().splice(other, index)
+
+    def __getitem__(self, index):
+        if self._source is None:
+            return super().__getitem__(index)
+        elif isinstance(index, int):
+            return self._source[self._range[index]]
+        else:
+            return ListContainerView(self, index)
+
+    def __iter__(self):
+        if self._source is None:
+            return super().__iter__()
+
+        range_ = self._range
+        if range_.step == 1:
+            return islice(self._source, range_.start, range_.stop)
+        return map(self._source.__getitem__, range_)
+
+    def index(self, value, start=0, stop=None):
+        if self._source is None:
+            return super().index(value, start, stop)
+        return abc.Sequence.index(self, value, start, stop)
+
+    def __len__(self):
+        if self._source is None:
+            return super().__len__()
+        return len(self._range)
@@ -0,0 +1,184 @@
+"""
+Doctree
+=======
+
+Convert documents directly into docutils nodes.
+
+Sphinx extensions which generate content with pyposo can append the nodes
+returned by `to_nodes` to their results instead of rendering
+reStructuredText and handing it to ``nested_parse``, which parses all of
+it again.  Sections get the same ids and names docutils would give them;
+inside of Sphinx, register them with ``document.note_implicit_target`` to
+make them referenceable.
+
+This module needs docutils.
+"""
+from docutils import frontend, nodes, utils
+from docutils.parsers.rst import Parser
+
+from .elements import plain_text
+from .writers import Writer
+
+_enumtypes = {
+    "1": "arabic",
+    "#": "arabic",
+    "a": "loweralpha",
+    "A": "upperalpha",
+    "i": "lowerroman",
+    "I": "upperroman",
+}
+
+
+def _unescape(str_):
+    string = str_.string
+    if str_.escaped:
+        string = utils.unescape(utils.escape2null(string))
+    return string
+
+
+class DoctreeWriter(Writer):
+    """Converts elements into docutils nodes.
+
+    Inline elements become lists of nodes, everything else a single node,
+    a `Document<pyposo.elements.Document>` becomes the list of its
+    children's nodes.
+    """
+
+    def _inline(self, element, child="content"):
+        result = []
+        for rendered in self.render_children(element, child):
+            for node in rendered:
+                if (
+                    isinstance(node, nodes.Text)
+                    and result
+                    and isinstance(result[-1], nodes.Text)
+                ):
+                    node = nodes.Text(result.pop() + node)
+                result.append(node)
+        return result
+
+    def _blocks(self, element, child="content"):
+        return self.render_children(element, child)
+
+    def visit_Document(self, document):
+        return self._blocks(document)
+
+    def visit_Str(self, str_):
+        return [nodes.Text(_unescape(str_))]
+
+    def visit_Space(self, space):
+        return [nodes.Text(" ")]
+
+    def visit_LineBreak(self, line_break):
+        return [nodes.Text("\n")]
+
+    def visit_Span(self, span):
+        return self._inline(span)
+
+    def visit_Emph(self, emph):
+        return [nodes.emphasis("", "", *self._inline(emph))]
+
+    def visit_Strong(self, strong):
+        return [nodes.strong("", "", *self._inline(strong))]
+
+    def visit_Target(self, target):
+        text = self._inline(target)
+        name = nodes.fully_normalize_name(plain_text(target.content))
+        return [
+            nodes.target("", "", *text, ids=[nodes.make_id(name)], names=[name])
+        ]
+
+    def visit_Reference(self, reference):
+        text = self._inline(reference) or [nodes.Text(reference.label)]
+        refname = nodes.fully_normalize_name(reference.label)
+        return [nodes.reference("", "", *text, refname=refname)]
+
+    def visit_Paragraph(self, paragraph):
+        return nodes.paragraph("", "", *self._inline(paragraph))
+
+    def visit_Plain(self, plain):
+        return nodes.paragraph("", "", *self._inline(plain))
+
+    def visit_StreamParagraph(self, paragraph):
+        # Markup in the text isn't parsed, it's kept as text.
+        text = paragraph._plain_text()
+        return nodes.paragraph(text, "", nodes.Text(text))
+
+    def visit__Section(self, section):
+        title = nodes.title("", "", *self._inline(section, "title"))
+        names = [nodes.fully_normalize_name(title.astext())]
+        if section.label is not None:
+            names.append(nodes.fully_normalize_name(section.label))
+        return nodes.section(
+            "",
+            title,
+            *self._blocks(section),
+            ids=[nodes.make_id(name) for name in names],
+            names=names,
+        )
+
+    def visit__DivBlock(self, block):
+        title = nodes.rubric("", "", *self._inline(block, "title"))
+        return nodes.container(
+            "", title, *self._blocks(block), classes=[block._directive]
+        )
+
+    def visit_LiteralBlock(self, block):
+        text = block.read_text()
+        return nodes.literal_block(text, text)
+
+    def visit_CodeBlock(self, block):
+        text = block.read_text()
+        classes = ["code"] + ([block.language] if block.language else [])
+        return nodes.literal_block(text, text, classes=classes)
+
+    def visit__ListItem(self, item):
+        return nodes.list_item("", *self._blocks(item))
+
+    def visit_BulletList(self, list_):
+        return nodes.bullet_list("", *self._blocks(list_), bullet="-")
+
+    def visit_EnumeratedList(self, list_):
+        prefix, kind, suffix = list_._style
+        attributes = {"enumtype": _enumtypes[kind]}
+        if list_.start != 1:
+            attributes["start"] = list_.start
+        return nodes.enumerated_list(
+            "", *self._blocks(list_), prefix=prefix, suffix=suffix, **attributes
+        )
+
+    def visit_FieldListItem(self, item):
+        return nodes.field(
+            "",
+            nodes.field_name("", "", *self._inline(item, "term")),
+            nodes.field_body("", *self._blocks(item)),
+        )
+
+    def visit_FieldList(self, list_):
+        return nodes.field_list("", *self._blocks(list_))
+
+
+def to_nodes(element):
+    """Convert `element` into a list of docutils nodes.
+
+    :rtype: list of :class:`docutils.nodes.Node`
+    """
+    result = DoctreeWriter().render(element)
+    return result if isinstance(result, list) else [result]
+
+
+def to_document(element, source_path="<pyposo>", settings=None):
+    """Convert `element` into a standalone docutils document.
+
+    :param settings: docutils settings, the defaults of the
+        reStructuredText parser are used if it's ``None``.
+    :rtype: :class:`docutils.nodes.document`
+    """
+    if settings is None:
+        settings = frontend.get_default_settings(Parser)
+    document = utils.new_document(source_path, settings)
+    for node in to_nodes(element):
+        document += node
+        if isinstance(node, nodes.section):
+            document.note_implicit_target(node)
+    return document
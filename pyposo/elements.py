@@ -5,11 +5,115 @@ Elements
 The elements, based upon the base elements which try to offer the core
 functionality of reStructruedText.
 """
-import textwrap
-
-from .containers import ListContainer
+from contextlib import contextmanager
+import contextvars
+from functools import partial
+import mmap
+import os
+from itertools import chain, count, islice
+import re
+import warnings
+import weakref
+
+from .containers import ListContainer, _find_index
 from .base import Element, Inline, Block
-from .utils import check_type
+from .cache import _cache_hit_callback
+from .utils import (
+    _DisplayWidthWrapper,
+    _caller_stacklevel,
+    check_type,
+    display_width,
+    escape_rst,
+    escape_rst_batch,
+    normalize_name,
+)
+
+_rst_unescape = partial(re.compile(r"\\(.)").sub, r"\1")
+
+_escape_markup = contextvars.ContextVar("pyposo_escape_markup", default=False)
+_resolver = contextvars.ContextVar("pyposo_resolver", default=None)
+
+# Stands in for a `Contents` block until all sections of the document are
+# known.
+_CONTENTS_PLACEHOLDER = "\0pyposo-contents\0"
+# The width text is wrapped at if the document doesn't set one, the default
+# of textwrap.
+_DEFAULT_TEXTWIDTH = 70
+# File blocks read, decode and indent this many bytes (rounded up to whole
+# lines) at a time.
+_FILE_BATCH_SIZE = 2 ** 16
+_line_starts = re.compile(r"^(?=.)", re.MULTILINE)
+# Gives every `StreamParagraph` a new fingerprint each time.
+_stream_versions = count()
+
+
+class UnresolvedReferenceWarning(UserWarning):
+    """Issued for references to targets which aren't part of the document."""
+
+
+class _Resolver:
+    """Collects targets, references and sections while a document renders.
+
+    Elements register themselves when they are rendered (or, if their
+    output came from the render cache, when the cached subtree is replayed
+    with `record_subtree`), so references and contents are resolved with a
+    single pass over the tree.
+    """
+
+    def __init__(self):
+        self.targets = set()
+        self.references = []
+        self.sections = []
+        self.contents = []
+
+    def record_subtree(self, element):
+        for e in element.walk():
+            register = getattr(type(e), "_register", None)
+            if register is not None:
+                register(e, self)
+
+    def resolve(self, text):
+        unresolved = sorted(
+            {name for name in self.references if name not in self.targets}
+        )
+        if unresolved:
+            warnings.warn(
+                "Unresolved references: {}.".format(", ".join(unresolved)),
+                UnresolvedReferenceWarning,
+                stacklevel=_caller_stacklevel(),
+            )
+
+        if not self.contents:
+            return text
+
+        parts = text.split(_CONTENTS_PLACEHOLDER)
+        result = [parts[0]]
+        for (contents, position), part in zip(self.contents, parts[1:]):
+            sections = islice(self.sections, position, None)
+            result.append(contents._render_entries(sections))
+            result.append(part)
+        return "".join(result)
+
+
+
+@contextmanager
+def escape_markup(escape=True):
+    """Escape the markup in all text converted to elements inside the block.
+
+    Inside of the ``with`` block, strings passed to elements like
+    `Paragraph` or `Emph` (and to :meth:`Str.from_str`) are escaped with
+    :func:`pyposo.utils.escape_rst`, so that user supplied text containing
+    ``*``, backticks, ``|`` or ``_`` is rendered as is.
+
+    :param escape: Pass ``False`` to turn escaping off again in a nested
+        block.
+    :type escape: bool
+    """
+    token = _escape_markup.set(escape)
+    try:
+        yield
+    finally:
+        _escape_markup.reset(token)
 
 
 def str_to_inline(text):
@@ -64,21 +168,123 @@ def str_to_block_tuple(text):
         return text
 
 
+def plain_text(elements):
+    """Return the text of `elements` without any markup.
+
+    :param elements: An element or a container of elements.
+    :type elements: `Element<pyposo.base.Element>` | `ListContainer`
+    :rtype: str
+    """
+    if isinstance(elements, Element):
+        elements = [elements]
+
+    text = []
+    for element in elements:
+        for e in element.walk():
+            if isinstance(e, Str):
+                string = e.string
+                text.append(_rst_unescape(string) if e.escaped else string)
+            elif isinstance(e, (Space, LineBreak)):
+                text.append(" ")
+    return "".join(text)
+
+
+def escape_text(element):
+    """Escape the markup of all text below `element` in one batch.
+
+    All `Str` elements which weren't escaped yet are escaped with a single
+    call of :func:`pyposo.utils.escape_rst_batch`, which is much faster
+    than escaping every string on its own.
+
+    :returns: `element`
+    """
+    # Leaves are checked by their parents instead of being pushed on the
+    # stack, since most elements of a document are `Str` and `Space`.
+    strs = [element] if isinstance(element, Str) else []
+    stack = [element]
+    while stack:
+        parent = stack.pop()
+        for name in parent._children:
+            for child in getattr(parent, f"_{name}").list:
+                if child._children:
+                    stack.append(child)
+                elif isinstance(child, Str):
+                    strs.append(child)
+
+    strs = [str_ for str_ in strs if not str_.escaped]
+    escaped = escape_rst_batch([str_.string for str_ in strs])
+    for str_, string in zip(strs, escaped):
+        str_.string = string
+        str_.escaped = True
+    return element
+
+
 class Document(Element):
     """The document class which elements should usually be part of.
 
     :param args: Children which are part of the document.
     :type args: `Block<pyposo.base.Block>` | `_Section<pyposo.elements._Section>`
+    :param textwidth: The width text is wrapped at.
+    :type textwidth: int
+    :param index: Whether to keep an index of the elements of the document,
+        see `enable_index`.
+    :type index: bool
     """
 
-    __slots__ = ["_textwidth"]
+    __slots__ = ["_textwidth", "_element_index"]
     _children = ["content"]
     _main_container = "content"
     _content_seperator = "\n"
+    _cacheable = True
+    _streamed = True
 
-    def __init__(self, *args, **kwargs):
-        self.textwidth = kwargs.get("textwidth", None)
+    def __init__(self, *args, textwidth=None, index=False):
+        self.textwidth = textwidth
+        self._element_index = None
         self._set_content(args, (_Section, Block))
+        if index:
+            self.enable_index()
+
+    @property
+    def element_index(self):
+        """The `DocumentIndex<pyposo.index.DocumentIndex>`, if it's enabled."""
+        return self._element_index
+
+    def enable_index(self):
+        """Index the elements of this document by type, title and label.
+
+        The index is built once and then kept up to date by every change of
+        the document.
+
+        :rtype: `DocumentIndex<pyposo.index.DocumentIndex>`
+        """
+        if self._element_index is None:
+            from .index import DocumentIndex
+
+            self._element_index = DocumentIndex(self)
+            self._element_index._enable()
+        return self._element_index
+
+    def disable_index(self):
+        """Drop the index, changes of the document aren't tracked anymore."""
+        if self._element_index is not None:
+            self._element_index._disable()
+            self._element_index = None
+
+    def _dump(self):
+        resolver = _Resolver()
+        token = _resolver.set(resolver)
+        callback_token = _cache_hit_callback.set(resolver.record_subtree)
+        try:
+            text = super()._dump()
+        finally:
+            _cache_hit_callback.reset(callback_token)
+            _resolver.reset(token)
+
+        return resolver.resolve(text)
+
+    def _fingerprint_fields(self):
+        return (self._textwidth,)
 
     @property
     def textwidth(self):
@@ -90,6 +296,136 @@ class Document(Element):
         self._textwidth = textwidth
 
 
+class _Flushed(Block):
+    """Stands in for the elements a `StreamingDocument` has written.
+
+    It keeps the following elements from rendering as the first ones.
+    """
+    __slots__ = []
+    _main_container = None
+
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def dump():
+        return ""
+
+
+class StreamingDocument(Document):
+    """A document which writes its parts to a file as soon as they're done.
+
+    Every time a ``create`` block of the document itself is left (and the
+    elements queued with ``append_later`` are appended), all elements of the
+    document are rendered, written and removed from it.  This way only the
+    section which is being built is kept in memory.  Call `flush` to write
+    elements which were appended without ``create``, and `close` (or use
+    the document as a context manager) to write the rest::
+
+        with StreamingDocument("huge.rst", textwidth=79) as document:
+            for chapter in chapters:
+                with document.create(Section(chapter.title)):
+                    ...
+
+    The written text is the same `Document.dump` would return for the whole
+    document, except that `Contents` can't be used, since the sections it
+    lists aren't known yet.  Unresolved references are reported by `close`.
+
+    :param file: The file to write to, paths are opened (and closed by
+        `close`) with UTF-8 encoding.
+    :type file: str | pathlib.Path | file object
+    :param args: Children which are part of the document, they are written
+        with the first flush.
+    :param textwidth: The width text is wrapped at.
+    :type textwidth: int
+    """
+
+    __slots__ = ["_file", "_owns_file", "_stream_resolver", "_references"]
+    _cacheable = False
+
+    def __init__(self, file, *args, textwidth=None):
+        super().__init__(*args, textwidth=textwidth)
+        if hasattr(file, "write"):
+            self._file = file
+            self._owns_file = False
+        else:
+            self._file = open(file, "w", encoding="utf-8")
+            self._owns_file = True
+        self._stream_resolver = _Resolver()
+        self._references = set()
+
+    @property
+    def closed(self):
+        """Whether `close` was called."""
+        return self._stream_resolver is None
+
+    def _child_created(self, child, level):
+        if level == 0:
+            self.flush()
+
+    def flush(self):
+        """Write all elements of the document and remove them from it."""
+        if self.closed:
+            raise ValueError("The document is closed.")
+
+        content = self._content
+        start = int(bool(content) and isinstance(content[0], _Flushed))
+        if start == len(content):
+            return
+
+        # Targets and references are collected before writing anything,
+        # the elements are then rendered piece by piece (see `iter_dump`),
+        # straight into the file.
+        resolver = self._stream_resolver
+        elements = list(content[start:])
+        for element in elements:
+            resolver.record_subtree(element)
+        if resolver.contents:
+            resolver.contents.clear()
+            raise ValueError("Contents can't be part of a StreamingDocument.")
+        # Only the names are needed to report unresolved references later,
+        # the sections would keep the written elements alive.
+        self._references.update(resolver.references)
+        resolver.references.clear()
+        resolver.sections.clear()
+
+        write = self._file.write
+        for index, element in enumerate(elements, start):
+            if index:
+                write(self._content_seperator)
+            for piece in element.iter_dump():
+                write(piece)
+        self._file.flush()
+
+        del content[start:]
+        if not start:
+            content.append(_Flushed())
+
+    def close(self):
+        """Write the rest of the document and close the file.
+
+        Closing a closed document does nothing.
+        """
+        if self.closed:
+            return
+        try:
+            self.flush()
+        finally:
+            if self._owns_file:
+                self._file.close()
+
+        resolver = self._stream_resolver
+        self._stream_resolver = None
+        resolver.references = list(self._references)
+        resolver.resolve("")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
 class Space(Inline):
     """A simple space.
 
@@ -122,17 +458,27 @@ class LineBreak(Inline):
 
 
 class Str(Inline):
-    """A simple string."""
-    __slots__ = ["string"]
+    """A simple string.
 
-    def __init__(self, string):
-        self.string = check_type(
-            string, str, "Expected a string; got: {type_}."
-        )
+    :param string: The text, without any whitespace.
+    :type string: str
+    :param escape: Whether to escape the reStructuredText markup in
+        `string`, see :func:`pyposo.utils.escape_rst`.
+    :type escape: bool
+    """
+    __slots__ = ["string", "escaped"]
+
+    def __init__(self, string, escape=False):
+        string = check_type(string, str, "Expected a string; got: {type_}.")
+        self.string = escape_rst(string) if escape else string
+        self.escaped = escape
 
     def dump(self):
         return self.string
 
+    def _fingerprint_fields(self):
+        return (self.string,)
+
     def _repr_children(self):
         return repr(self.string)
 
@@ -147,11 +493,77 @@ class Str(Inline):
             yield cls(s)
 
     @classmethod
-    def from_str(cls, string):
-        return list(cls._from_str(string))
+    def from_str(cls, string, escape=None):
+        """Split `string` into `Str` and `Space` elements.
+
+        :param escape: Whether to escape markup, by default it is only
+            escaped inside of an :func:`escape_markup` block.
+        :type escape: bool
+        """
+        if escape is None:
+            escape = _escape_markup.get()
+
+        if not escape:
+            return list(cls._from_str(string))
+
+        elements = list(cls._from_str(escape_rst(string)))
+        for element in elements[::2]:
+            element.escaped = True
+        return elements
 
     def __len__(self):
-        return len(self.string)
+        return display_width(self.string)
+
+
+def _wrap_settings(block):
+    """Return the width, first line indent and indent `block` is wrapped at."""
+    width = block.textwidth
+    if width is None:
+        width = _DEFAULT_TEXTWIDTH
+    indent = " " * block.indent
+
+    # The first line of the first paragraph of a list item follows the
+    # item's leader, which may be longer than the indent.
+    parent = block.parent
+    first_indent = indent
+    if isinstance(parent, _ListItem) and block.is_first:
+        first_indent = " " * (parent.indent + display_width(parent.leader))
+
+    return width, first_indent, indent
+
+
+def _wrap_context(block):
+    """Return the `_render_context` of blocks wrapped by `_wrap_block`.
+
+    The first line indent depends on the leader of the parent, which isn't
+    part of the position in the tree the render cache keys on.
+    """
+    return (len(_wrap_settings(block)[1]),)
+
+
+def _wrap_block(block, content, keep_lines):
+    """Wrap `content` at the final indent and width of `block`.
+
+    :param keep_lines: Whether to keep line breaks, otherwise all whitespace
+        is collapsed like by `textwrap.fill`.
+    """
+    width, first_indent, indent = _wrap_settings(block)
+    if not keep_lines:
+        lines = _DisplayWidthWrapper(
+            width=width, initial_indent=first_indent, subsequent_indent=indent
+        ).wrap(content)
+    else:
+        lines = []
+        wrapper = _DisplayWidthWrapper(
+            width=width, replace_whitespace=False, subsequent_indent=indent
+        )
+        for linenumber, line in enumerate(content.splitlines()):
+            wrapper.initial_indent = first_indent if linenumber == 0 else indent
+            lines.extend(wrapper.wrap(line) or [""])
+
+    if lines and first_indent is not indent:
+        lines[0] = indent + lines[0][len(first_indent) :]
+    return "\n".join(lines)
 
 
 class Paragraph(Block):
@@ -162,20 +574,18 @@ class Paragraph(Block):
 
     @property
     def format_string(self):
-        if self.index == 0 or self.index is None:
+        if self.is_first is not False:
             return "{content}"
         else:
             return "\n{content}"
 
     def _render_content(self):
         content = "".join(c.dump() for c in self.content)
-        kwargs = {}
-        if self.textwidth is not None:
-            kwargs["width"] = self.textwidth
-        if isinstance(self.parent, (Document, _Section)):
-            return textwrap.fill(content, **kwargs)
-        else:
-            return content
+        # Line breaks are only kept in lists and directives.
+        keep_lines = not isinstance(self.parent, (Document, _Section))
+        return _wrap_block(self, content, keep_lines)
+
+    _render_context = _wrap_context
 
 
 class Plain(Block):
@@ -188,6 +598,160 @@ class Plain(Block):
     def format_string(self):
         return "{content}"
 
+    def _render_content(self):
+        content = "".join(c.dump() for c in self.content)
+        if isinstance(self.parent, (Document, _Section)):
+            return self._indent_lines(content)
+        return _wrap_block(self, content, keep_lines=True)
+
+    _render_context = _wrap_context
+
+
+class StreamParagraph(Block):
+    """A paragraph whose text is read from a stream while it is rendered.
+
+    The text is wrapped a buffer at a time, words split between chunks are
+    put back together, so the memory used doesn't depend on the length of
+    the text.  Runs of whitespace are collapsed like in a `Paragraph`, line
+    breaks aren't kept, and words are only broken if they are longer than
+    a line.
+
+    Since the text isn't known before it is rendered, the paragraph has a
+    new `fingerprint<pyposo.base.Element.fingerprint>` every time and isn't
+    cached.
+
+    :param source: A text file, which is read from its current position
+        (and rewound for every rendering if it's seekable), or an iterable
+        of strings.  Iterators can only be rendered once.
+    :type source: file | iterable of str
+    :param escape: Whether to escape the reStructuredText markup in the
+        text, by default it is only escaped inside of an
+        :func:`escape_markup` block.
+    :type escape: bool
+    """
+
+    __slots__ = ["source", "escape", "_position", "_consumed"]
+    _main_container = None
+    _cacheable = False
+    _streamed = True
+    _buffer_size = 2 ** 16
+
+    def __init__(self, source, escape=None):
+        if isinstance(source, str):
+            source = (source,)
+        self.source = source
+        self.escape = _escape_markup.get() if escape is None else escape
+        self._position = None
+        if hasattr(source, "read") and source.seekable():
+            self._position = source.tell()
+        self._consumed = False
+
+    def _fingerprint_fields(self):
+        return (next(_stream_versions),)
+
+    def _repr_children(self):
+        return repr(self.source)
+
+    def _chunks(self):
+        source = self.source
+        if hasattr(source, "read"):
+            if self._position is not None:
+                source.seek(self._position)
+            elif self._consumed:
+                raise RuntimeError("The stream can only be read once.")
+            chunks = iter(partial(source.read, self._buffer_size), "")
+        else:
+            chunks = iter(source)
+            if chunks is source and self._consumed:
+                raise RuntimeError("The iterator can only be read once.")
+        self._consumed = True
+
+        for chunk in chunks:
+            chunk = check_type(chunk, str, "Expected text; got: {type_}.")
+            yield escape_rst(chunk) if self.escape else chunk
+
+    def _iter_lines(self):
+        width, first_indent, indent = _wrap_settings(self)
+        wrapper = _DisplayWidthWrapper(
+            width=width, initial_indent=first_indent, subsequent_indent=indent
+        )
+        # The last line is wrapped again together with the next buffer, the
+        # lines before it can't change anymore.
+        line = ""
+        # Whether the next buffer continues the last word of `line`.
+        glued = False
+        first = True
+
+        pending = []
+        size = 0
+        chunks = self._chunks()
+        for chunk in chain(chunks, [None]):
+            last = chunk is None
+            if not last:
+                pending.append(chunk)
+                size += len(chunk)
+                if size < self._buffer_size:
+                    continue
+
+            text = "".join(pending)
+            joiner = "" if glued and text and not text[0].isspace() else " "
+            words = text.split()
+            # The last word may continue in the next chunk.
+            partial_word = ""
+            if not last and words and not text[-1].isspace():
+                partial_word = words.pop()
+            glued = False
+            if len(partial_word) > max(self._buffer_size, width):
+                # Words longer than a line are broken anyway.
+                words.append(partial_word)
+                partial_word = ""
+                glued = True
+            elif not words:
+                glued = joiner == "" and bool(partial_word)
+            pending = [partial_word]
+            size = len(partial_word)
+
+            if not words and not (last and line):
+                continue
+            text = " ".join(words)
+            if line:
+                text = f"{line}{joiner}{text}" if text else line
+            lines = wrapper.wrap(text)
+            if not last:
+                prefix = wrapper.initial_indent if len(lines) == 1 else indent
+                line = lines.pop()[len(prefix) :]
+            if lines and first:
+                first = False
+                lines[0] = indent + lines[0][len(first_indent) :]
+                wrapper.initial_indent = indent
+            yield from lines
+
+    @property
+    def format_string(self):
+        if self.is_first is not False:
+            return "{content}"
+        else:
+            return "\n{content}"
+
+    def _plain_text(self):
+        """Return the whole text, without markup escapes, for other writers."""
+        text = " ".join("".join(self._chunks()).split())
+        return _rst_unescape(text) if self.escape else text
+
+    def iter_dump(self):
+        if self.is_first is False:
+            yield "\n"
+        lines = self._iter_lines()
+        for line in lines:
+            yield line
+            break
+        for line in lines:
+            yield "\n"
+            yield line
+
+    def dump(self):
+        return "".join(self.iter_dump())
+
 
 class _DivBlock(Block):
     _children = ["content", "title"]
@@ -195,6 +759,7 @@ class _DivBlock(Block):
     _content_indent = 3
     _content_seperator = "\n"
     _leader = ""
+    _streamed = True
 
     def __init__(self, title, *args):
         title = str_to_inline_tuple(title)
@@ -206,9 +771,9 @@ class _DivBlock(Block):
     def format_string(self):
         fs = "{title}"
         if self.content:
-            fs = f"{fs}\n\n{{{self.content}}}"
+            fs = f"{fs}\n\n{{content}}"
 
-        if self.index == 0:
+        if self.is_first is False:
             fs = f"\n{fs}"
 
         return fs
@@ -216,16 +781,9 @@ class _DivBlock(Block):
     def _render_title(self):
         format_string = ".. {directive}:: {title}"
         title = "".join(t.dump() for t in self.title)
-        return format_string.format(directive=self._directive, title=title)
-
-    @property
-    def indent(self):
-        indent = 0
-        parent = self.parent
-        while not isinstance(parent, (Document, type(None))):
-            indent += getattr(parent, "_content_indent", 0)
-            parent = parent.parent
-        return indent
+        return self._indent_lines(
+            format_string.format(directive=self._directive, title=title).rstrip()
+        )
 
     @property
     def content_indent(self):
@@ -243,26 +801,134 @@ class _DivBlock(Block):
     def leader(self):
         return self._leader
 
-    def _wrap(self, linenumber, text):
-        cw = self.content_width
-        kwargs = {"width": cw} if cw is not None else {}
-        return textwrap.wrap(
-            text,
-            replace_whitespace=False,
-            initial_indent=self.content_indent,
-            subsequent_indent=self.content_indent,
-            **kwargs,
-        )
+    def _render_content(self):
+        # The children are rendered at their final indent already.
+        return self._content_seperator.join(c.dump() for c in self.content)
+
+    def _iter_content(self):
+        return self._iter_children("content")
+
+
+class _FileBlock(_DivBlock):
+    """Base class of blocks showing a byte range of a file verbatim.
+
+    The file is only read while the block is rendered, through a memory
+    map and a batch of lines at a time, so even huge files are never held
+    in memory as a whole.  The encoding has to be ASCII compatible (like
+    UTF-8 or Latin-1), since the text is split at newline bytes.
+    """
+    __slots__ = ["path", "start", "stop", "encoding"]
+    _cacheable = False
+
+    def __init__(self, path, title, start=0, stop=None, encoding="utf-8"):
+        super().__init__(title)
+        self.path = os.fspath(path)
+        self.start = check_type(start, int)
+        self.stop = check_type(stop, (int, type(None)))
+        self.encoding = check_type(encoding, str)
+
+    def _fingerprint_fields(self):
+        try:
+            stat = os.stat(self.path)
+            version = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            version = None
+        return (self.path, self.start, self.stop, self.encoding, version)
+
+    def _range(self, size):
+        stop = size if self.stop is None else min(self.stop, size)
+        return min(self.start, stop), stop
+
+    @property
+    def format_string(self):
+        start, stop = self._range(os.stat(self.path).st_size)
+        fs = "{title}\n\n{content}" if start < stop else "{title}"
+        if self.is_first is False:
+            fs = f"\n{fs}"
+        return fs
+
+    def _iter_text(self):
+        """Iterate over the text of the byte range, in batches of lines."""
+        with open(self.path, "rb") as file_:
+            start, stop = self._range(os.fstat(file_.fileno()).st_size)
+            if start == stop:
+                # Empty files can't be mapped.
+                return
+
+            with mmap.mmap(file_.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if data[stop - 1] == ord("\n"):
+                    stop -= 1
+
+                position = start
+                while position < stop:
+                    end = min(position + _FILE_BATCH_SIZE, stop)
+                    if end < stop:
+                        newline = data.find(b"\n", end, stop)
+                        end = stop if newline == -1 else newline + 1
+                    yield data[position:end].decode(self.encoding)
+                    position = end
+
+    def read_text(self):
+        """Return the whole text of the byte range.
+
+        :rtype: str
+        """
+        return "".join(self._iter_text())
+
+    def _iter_content(self):
+        prefix = " " * (self.indent + self._content_indent)
+        for text in self._iter_text():
+            yield _line_starts.sub(prefix, text)
 
     def _render_content(self):
-        item = self._content_seperator.join(c.dump() for c in self.content)
-        item = item.splitlines()
+        return "".join(self._iter_content())
 
-        item = list(map(lambda i: self._wrap(*i), enumerate(item)))
 
-        item = list("\n".join(i) for i in item)
-        content = self._content_seperator.join(item)
-        return content
+class LiteralBlock(_FileBlock):
+    """A literal block showing (a part of) a file.
+
+    :param path: The file.
+    :type path: str | pathlib.Path
+    :param start: The offset of the first byte to show.
+    :type start: int
+    :param stop: The offset after the last byte to show, by default the
+        file is shown up to its end.
+    :type stop: int
+    :param encoding: The encoding of the file.
+    :type encoding: str
+    """
+
+    def __init__(self, path, start=0, stop=None, encoding="utf-8"):
+        super().__init__(path, "", start, stop, encoding)
+
+    def _render_title(self):
+        return self._indent_lines("::")
+
+
+class CodeBlock(_FileBlock):
+    """A ``code-block`` directive showing (a part of) a file.
+
+    :param path: The file.
+    :type path: str | pathlib.Path
+    :param language: The language to highlight the code as.
+    :type language: str
+    :param start: The offset of the first byte to show.
+    :type start: int
+    :param stop: The offset after the last byte to show, by default the
+        file is shown up to its end.
+    :type stop: int
+    :param encoding: The encoding of the file.
+    :type encoding: str
+    """
+    __slots__ = ["language"]
+    _directive = "code-block"
+
+    def __init__(self, path, language=None, start=0, stop=None, encoding="utf-8"):
+        self.language = check_type(language, (str, type(None)))
+        super().__init__(path, language or "", start, stop, encoding)
+
+    def _fingerprint_fields(self):
+        return super()._fingerprint_fields() + (self.language,)
 
 
 class _Wrapped(Inline):
@@ -301,38 +967,256 @@ class Strong(_Wrapped):
     _head = "**"
 
 
+class Target(Inline):
+    """An inline hyperlink target, its text is the name of the target.
+
+    :param args: The text of the target.
+    """
+    _children = ["content"]
+    _main_container = "content"
+
+    def __init__(self, *args):
+        args = str_to_inline_tuple(args)
+        self._set_content(args, Inline)
+
+    def _register(self, resolver):
+        resolver.targets.add(normalize_name(plain_text(self.content)))
+
+    def _render_content(self):
+        resolver = _resolver.get()
+        if resolver is not None:
+            self._register(resolver)
+        return "_`{}`".format("".join(c.dump() for c in self.content))
+
+
+class Reference(Inline):
+    """A reference to a label, section title or `Target`.
+
+    :param label: The name of the target.
+    :type label: str
+    :param args: The text of the link, the label is shown if it's empty.
+    :param role: Render the reference with this role, e.g. ``"ref"`` for
+        Sphinx' ``:ref:`` instead of as a hyperlink reference.
+    :type role: str
+    """
+    __slots__ = ["label", "role"]
+    _children = ["content"]
+    _main_container = "content"
+
+    def __init__(self, label, *args, role=None):
+        self.label = check_type(label, str)
+        self.role = check_type(role, (str, type(None)))
+        args = str_to_inline_tuple(args)
+        self._set_content(args, Inline)
+
+    def _fingerprint_fields(self):
+        return (self.label, self.role)
+
+    def _register(self, resolver):
+        resolver.references.append(normalize_name(self.label))
+
+    def _render_content(self):
+        resolver = _resolver.get()
+        if resolver is not None:
+            self._register(resolver)
+
+        text = "".join(c.dump() for c in self.content)
+        if self.role is not None:
+            target = f"{text} <{self.label}>" if text else self.label
+            return f":{self.role}:`{target}`"
+        elif text:
+            return f"`{text} <{self.label}_>`_"
+        else:
+            return f"`{self.label}`_"
+
+
+class Contents(Block):
+    """A list of links to the sections of the document.
+
+    The list is generated while the document is rendered, so the sections
+    may come after it.  It can only be part of a `Document` or a section.
+
+    :param title: Shown above the list.
+    :type title: str
+    :param local: Only list the sections up to the next section which isn't
+        below the section this list is part of.
+    :type local: bool
+    :param depth: The number of section levels to list.
+    :type depth: int
+    """
+    __slots__ = ["title", "local", "depth"]
+    _main_container = None
+    _cacheable = False
+
+    def __init__(self, title=None, local=True, depth=None):
+        self.title = check_type(title, (str, type(None)))
+        self.local = local
+        self.depth = check_type(depth, (int, type(None)))
+
+    def _fingerprint_fields(self):
+        return (self.title, self.local, self.depth)
+
+    def _register(self, resolver):
+        resolver.contents.append((self, len(resolver.sections)))
+
+    def _check_parent(self):
+        if not isinstance(self.parent, (Document, _Section)):
+            raise RuntimeError(
+                "Contents can only be part of a Document or a section."
+            )
+
+    def _dump(self):
+        self._check_parent()
+        resolver = _resolver.get()
+        if resolver is None:
+            return ""
+        self._register(resolver)
+
+        if self.is_first is False:
+            return f"\n{_CONTENTS_PLACEHOLDER}"
+        return _CONTENTS_PLACEHOLDER
+
+    def iter_dump(self):
+        # Without the whole document being rendered, the entries are found
+        # by walking the sections after this block.
+        self._check_parent()
+        entries = self._render_entries(self._following_sections())
+        if self.is_first is False:
+            entries = f"\n{entries}"
+        yield entries
+
+    def _following_sections(self):
+        """Iterate over the sections after this block in document order."""
+        element = self
+        while element.parent is not None:
+            container = element.container
+            siblings = container.list[container.index(element) + 1 :]
+            stack = siblings[::-1]
+            while stack:
+                e = stack.pop()
+                if isinstance(e, _Section):
+                    yield e
+                # Sections can only be part of sections and directives.
+                if isinstance(e, (_Section, _DivBlock)):
+                    stack.extend(reversed(e.content.list))
+            element = element.parent
+
+    def _render_entries(self, sections):
+        level = getattr(self.parent, "_level", 0)
+
+        entries = []
+        for section in sections:
+            if self.local and section._level <= level:
+                break
+            if self.depth is None or section._level <= level + self.depth:
+                entries.append(section)
+
+        if not entries:
+            return ""
+
+        root = BulletList()
+        lists = [(min(section._level for section in entries), root)]
+        for section in entries:
+            while section._level < lists[-1][0]:
+                lists.pop()
+
+            list_level, list_ = lists[-1]
+            if section._level > list_level and list_.content:
+                sublist = BulletList()
+                list_.content[-1].append(sublist)
+                lists.append((section._level, sublist))
+                list_ = sublist
+
+            title = plain_text(section.title)
+            if section.label is None:
+                reference = Reference(title)
+            else:
+                reference = Reference(section.label, title)
+            list_.append(ListItem(Plain(reference)))
+
+        text = root.dump().strip("\n")
+        if self.title is not None:
+            text = f"**{self.title}**\n\n{text}"
+        return text
+
+
 class _Section(Element):
     """
     Base class for :class:`Title` and sections/subsections ..
+
+    :param title: The title of the section.
+    :param args: The content of the section.
+    :param label: A label which is rendered as a hyperlink target
+        (``.. _label:``) in front of the section.
+    :type label: str
     """
+    __slots__ = ["_label"]
     _children = ["title", "content"]
     _header_char = "="
     _overline = False
     _inset = False
+    _level = 1
     _content_seperator = "\n"
     _main_container = "content"
+    _cacheable = True
+    _streamed = True
 
-    def __init__(self, title, *args):
+    def __init__(self, title, *args, label=None):
         title = str_to_inline_tuple(title)
 
+        self._label = check_type(label, (str, type(None)))
         self._set_title(title, Inline)
         self._set_content(args, Block)
 
+    @property
+    def label(self):
+        return self._label
+
+    @label.setter
+    def label(self, label):
+        label = check_type(label, (str, type(None)))
+        index = _find_index(self)
+        if index is not None:
+            index._remove_section(self)
+        self._label = label
+        if index is not None:
+            index._add_section(self)
+
+    def _fingerprint_fields(self):
+        return (self._label,)
+
+    def _register(self, resolver):
+        resolver.sections.append(self)
+        resolver.targets.add(normalize_name(plain_text(self.title)))
+        if self._label is not None:
+            resolver.targets.add(normalize_name(self._label))
+
+    def _dump(self):
+        resolver = _resolver.get()
+        if resolver is not None:
+            self._register(resolver)
+        return super()._dump()
+
     def _render_title(self):
-        format_string = "{overline}{title}\n{underline}\n"
+        format_string = "{label}{overline}{title}\n{underline}\n"
 
         title = "".join(c.dump() for c in self.title)
         if self._inset:
             title = f" {title} "
 
-        return format_string.format(
-            overline=(
-                "{}\n".format(self._header_char * len(title))
-                if self._overline
-                else ""
-            ),
-            title=title,
-            underline=self._header_char * len(title),
+        return self._indent_lines(
+            format_string.format(
+                label=(
+                    "" if self._label is None else f".. _{self._label}:\n\n"
+                ),
+                overline=(
+                    "{}\n".format(self._header_char * display_width(title))
+                    if self._overline
+                    else ""
+                ),
+                title=title,
+                underline=self._header_char * display_width(title),
+            )
         )
 
     @property
@@ -342,7 +1226,7 @@ class _Section(Element):
         else:
             fs = "{title}"
 
-        if not (self.index == 0 or self.index is None):
+        if self.is_first is False:
             fs = f"\n{fs}"
 
         return fs
@@ -351,6 +1235,7 @@ class _Section(Element):
 class Title(_Section):
     _overline = True
     _inset = True
+    _level = 0
 
 
 class Section(_Section):
@@ -359,10 +1244,12 @@ class Section(_Section):
 
 class Subsection(_Section):
     _header_char = "-"
+    _level = 2
 
 
 class Subsubsection(_Section):
     _header_char = "~"
+    _level = 3
 
 
 class _ListItem(Element):
@@ -371,19 +1258,13 @@ class _ListItem(Element):
     _content_indent = 2
     _main_container = "content"
     _leader = "- "
+    _cacheable = True
+    _streamed = True
+    _nested_list_follows_leader = True
 
     def __init__(self, *args):
         self._set_content(args, Block, converter=str_to_block)
 
-    @property
-    def indent(self):
-        indent = 0
-        parent = self.parent
-        while not isinstance(parent, (Document, type(None))):
-            indent += getattr(parent, "_content_indent", 0)
-            parent = parent.parent
-        return indent
-
     @property
     def content_indent(self):
         return " " * self._content_indent
@@ -400,34 +1281,43 @@ class _ListItem(Element):
             content_width = self.textwidth - self.indent
         return content_width
 
-    def _wrap(self, linenumber, text):
-        cw = self.content_width
-        kwargs = {"width": cw} if cw is not None else {}
-        return textwrap.wrap(
-            text,
-            replace_whitespace=False,
-            initial_indent=(
-                self.leader if linenumber == 0 else self.content_indent
-            ),
-            subsequent_indent=self.content_indent,
-            **kwargs,
-        )
+    def _add_leader(self, content):
+        # The children are rendered at their final indent already, only the
+        # indent of the first line is replaced by the leader.  Nested lists
+        # start with a blank line, which is dropped so that their first item
+        # follows the leader, unless `_nested_list_follows_leader` is false,
+        # then the list follows the blank line.
+        leader = " " * self.indent + self.leader
+        stripped = content.lstrip("\n")
+        if not stripped:
+            return leader.rstrip() + content
+        if content[0] == "\n" and not self._nested_list_follows_leader:
+            return f"{leader.rstrip()}\n{content}"
+        return leader + stripped[self.indent + self._content_indent :]
 
     def _render_content(self):
-        item = self._content_seperator.join(c.dump() for c in self.content)
-        item = item.splitlines()
-
-        item = list(map(lambda i: self._wrap(*i), enumerate(item)))
+        return self._add_leader(
+            self._content_seperator.join(c.dump() for c in self.content)
+        )
 
-        item = list("\n".join(i) for i in item)
-        content = self._content_seperator.join(item)
-        return content
+    def _iter_content(self):
+        pieces = self._iter_children("content")
+        skipped = []
+        for piece in pieces:
+            skipped.append(piece)
+            if piece.lstrip("\n"):
+                yield self._add_leader("".join(skipped))
+                break
+        else:
+            yield self._add_leader("".join(skipped))
+        yield from pieces
 
 
 class _List(Block):
     __slots__ = []
     _children = ["content"]
     _content_seperator = "\n"
+    _streamed = True
 
     def __init__(self, *args):
         self._set_content(args, _ListItem)
@@ -440,6 +1330,9 @@ class _List(Block):
         children = list(c.dump() for c in self.content)
         return self._content_seperator.join(children)
 
+    def _iter_content(self):
+        return self._iter_children("content")
+
 
 class ListItem(_ListItem):
     pass
@@ -451,29 +1344,199 @@ class BulletList(_List):
 
 
 class EnumeratedListItem(_ListItem):
+    __slots__ = ["_enumerator", "_enumerator_width", "_enumerated_as"]
+
+    def __init__(self, *args):
+        self._enumerator = None
+        self._enumerator_width = None
+        # A weak reference to the list the enumerator was computed for, and
+        # the position, number of items, start and style it was computed at.
+        self._enumerated_as = None
+        super().__init__(*args)
+
+    def _render_context(self):
+        self._ensure_enumerator()
+        return (self._enumerator, self._enumerator_width)
+
+    def _ensure_enumerator(self):
+        parent = self.parent
+        if not isinstance(parent, EnumeratedList):
+            self._enumerator = "1."
+            self._enumerator_width = 3
+        elif not self._is_enumerated():
+            parent._enumerate()
+
+    def _is_enumerated(self):
+        """Return whether the enumerator still fits the list it's from.
+
+        The enumerator of an item only depends on its position, the number
+        of items, the start and the style, so this doesn't need to look at
+        the other items.
+        """
+        if self._enumerated_as is None:
+            return False
+        numbers, position, count, start, style = self._enumerated_as
+        numbers = numbers()
+        if numbers is None:
+            return False
+        items = numbers.content.list
+        return (
+            count == len(items)
+            and start == numbers._start
+            and style == numbers._style
+            and items[position] is self
+        )
+
     @property
     def _content_indent(self):
-        return len(self.container) // 10 + 3
+        self._ensure_enumerator()
+        return self._enumerator_width
 
     @property
     def leader(self):
-        return "{}.{:{align}}".format(
-            self.index + 1,
-            "",
-            align=self._content_indent - (self.index + 1) // 10 - 2,
-        )
+        self._ensure_enumerator()
+        return f"{self._enumerator:{self._enumerator_width}}"
+
+
+def _to_alpha(number):
+    letters = ""
+    while number > 0:
+        number, remainder = divmod(number - 1, 26)
+        letters = chr(ord("a") + remainder) + letters
+    return letters
+
+
+_ROMAN_NUMERALS = (
+    (1000, "m"),
+    (900, "cm"),
+    (500, "d"),
+    (400, "cd"),
+    (100, "c"),
+    (90, "xc"),
+    (50, "l"),
+    (40, "xl"),
+    (10, "x"),
+    (9, "ix"),
+    (5, "v"),
+    (4, "iv"),
+    (1, "i"),
+)
+
+
+def _to_roman(number):
+    numeral = ""
+    for value, letters in _ROMAN_NUMERALS:
+        count, number = divmod(number, value)
+        numeral += letters * count
+    return numeral
+
+
+_ENUMERATORS = {
+    "1": str,
+    "#": None,
+    "a": _to_alpha,
+    "A": lambda number: _to_alpha(number).upper(),
+    "i": _to_roman,
+    "I": lambda number: _to_roman(number).upper(),
+}
+
+
+def _parse_enumerator_style(style):
+    for kind in _ENUMERATORS:
+        prefix, found, suffix = style.partition(kind)
+        if found and (prefix, suffix) in (("", "."), ("", ")"), ("(", ")")):
+            return prefix, kind, suffix
+
+    raise ValueError(
+        f"Unknown enumerator style: {style!r}; "
+        'expected something like "1.", "a)" or "(i)".'
+    )
 
 
 class EnumeratedList(_List):
-    def __init__(self, *args):
+    """An enumerated list.
+
+    The numbers and the shared indent of all items are computed in one
+    pass when the list is rendered.
+
+    :param args: The items of the list.
+    :type args: `EnumeratedListItem<pyposo.elements.EnumeratedListItem>`
+    :param start: The number of the first item.
+    :type start: int
+    :param style: The enumerator of the first item, e.g. ``"1."``,
+        ``"#."``, ``"a."``, ``"A)"``, ``"i."`` or ``"(1)"``.  Only the
+        kind of enumerator and its punctuation are taken from it.
+    :type style: str
+    """
+
+    __slots__ = ["_start", "_style"]
+
+    def __init__(self, *args, start=1, style="1."):
+        self.start = start
+        self.style = style
         self._set_content(args, EnumeratedListItem)
 
+    def _fingerprint_fields(self):
+        return (self._start, self._style)
+
+    @property
+    def start(self):
+        return self._start
+
+    @start.setter
+    def start(self, start):
+        start = check_type(start, int)
+        if start < 1:
+            raise ValueError(f"Expected a start of 1 or above; got: {start}.")
+        self._start = start
+
+    @property
+    def style(self):
+        return "".join(self._style)
+
+    @style.setter
+    def style(self, style):
+        self._style = _parse_enumerator_style(check_type(style, str))
+
+    def _enumerate(self):
+        prefix, kind, suffix = self._style
+        to_str = _ENUMERATORS[kind]
+
+        items = self.content.list
+        if to_str is None:
+            enumerators = [f"{prefix}#{suffix}"] * len(items)
+        else:
+            enumerators = [
+                f"{prefix}{to_str(number)}{suffix}"
+                for number in range(self._start, self._start + len(items))
+            ]
+
+        width = max(map(len, enumerators), default=0) + 1
+        numbers = weakref.ref(self)
+        for position, (item, enumerator) in enumerate(zip(items, enumerators)):
+            item._enumerator = enumerator
+            item._enumerator_width = width
+            item._enumerated_as = (
+                numbers, position, len(items), self._start, self._style
+            )
+
+    def _render_content(self):
+        self._enumerate()
+        return super()._render_content()
+
+    def _iter_content(self):
+        self._enumerate()
+        return super()._iter_content()
+
 
 class FieldListItem(_ListItem):
     _children = ["term", "content"]
     _max_content_indent = 7
     _fallback_content_indent = 3
     _main_container = "content"
+    # docutils takes the indent of field bodies from their second line, which
+    # for nested lists isn't the indent of the body.
+    _nested_list_follows_leader = False
 
     def __init__(self, term, *args):
         term = str_to_inline_tuple(term)
@@ -497,10 +1560,11 @@ class FieldListItem(_ListItem):
 
     @property
     def _content_indent(self):
-        if len(self.leader) > self._max_content_indent:
+        width = display_width(self.leader)
+        if width > self._max_content_indent:
             return self._fallback_content_indent
         else:
-            return len(self.leader)
+            return width
 
 
 class FieldList(_List):
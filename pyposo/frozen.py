@@ -0,0 +1,311 @@
+"""
+Frozen Trees
+============
+
+Immutable snapshots of element trees which share unchanged subtrees.
+
+`freeze<pyposo.base.Element.freeze>` turns an element and everything below
+it into `FrozenElement` objects.  They can't be changed, instead their
+`replace<FrozenElement.replace>`, `insert<FrozenElement.insert>` and
+`delete<FrozenElement.delete>` methods return a new root which shares all
+subtrees that weren't touched with the old one, so keeping many versions of
+a document costs little more than keeping one::
+
+    draft = document.freeze()
+    reviewed = draft.replace((0, 1), Paragraph("Better wording."))
+    published = reviewed.delete((2,))
+
+Since a frozen element can be part of many trees, it doesn't know its parent.
+Elements are addressed by paths from the root instead: a path is a sequence
+of steps, a step is the index of a child in the main container (e.g.
+``content``), or a ``(child name, index)`` pair for other containers, e.g.
+``(("title", 0),)``.  `ancestors<FrozenElement.ancestors>` resolves the
+parents of an element from its path.
+
+Frozen trees are rendered by `thawing<FrozenElement.thaw>` them into new
+mutable trees, so any number of threads can render the same version at once.
+"""
+from .containers import ListContainer
+from .utils import allowed_types_to_str
+
+# Slots which aren't kept in frozen elements, and what they are set to when
+# thawing.
+_RESET_SLOTS = {"_parent": None, "location": None, "_element_index": None}
+_state_slots = {}
+
+
+def _slots(cls):
+    """Return the names and descriptors of the state slots of `cls`."""
+    try:
+        return _state_slots[cls]
+    except KeyError:
+        pass
+
+    children = {f"_{name}" for name in cls._children}
+    slots = []
+    for base in cls.__mro__:
+        for name in base.__dict__.get("__slots__", ()):
+            if (
+                name not in _RESET_SLOTS
+                and name not in children
+                and name != "__weakref__"
+            ):
+                slots.append((name, base.__dict__[name]))
+    _state_slots[cls] = slots
+    return slots
+
+
+def freeze(element):
+    """Return a `FrozenElement` snapshot of `element` and its children.
+
+    The tree is walked without recursion.
+
+    :rtype: `FrozenElement`
+    """
+    # Parents come before their children in `order`, so walking it backwards
+    # freezes all children before their parents.
+    order = []
+    stack = [element]
+    while stack:
+        e = stack.pop()
+        order.append(e)
+        for name in e._children:
+            stack.extend(getattr(e, f"_{name}").list)
+
+    frozen = {}
+    for e in reversed(order):
+        cls = type(e)
+        state = []
+        for name, descriptor in _slots(cls):
+            try:
+                state.append((name, descriptor.__get__(e, cls)))
+            except AttributeError:
+                pass
+
+        children = []
+        for name in e._children:
+            container = getattr(e, f"_{name}")
+            nodes = tuple(frozen.pop(id(c)) for c in container.list)
+            children.append(
+                (name, nodes, container.oktypes, container.converter)
+            )
+
+        frozen[id(e)] = FrozenElement(cls, tuple(state), tuple(children))
+
+    return frozen[id(element)]
+
+
+class FrozenElement:
+    """An immutable snapshot of an element and all elements below it.
+
+    Use `Element.freeze<pyposo.base.Element.freeze>` to create one.
+
+    :ivar cls: The class of the element.
+    :ivar state: ``(slot, value)`` pairs of the element's attributes.
+    :ivar children: ``(name, nodes, oktypes, converter)`` tuples, one for
+        each child container, with the frozen children in `nodes`.
+    """
+
+    __slots__ = ["cls", "state", "children"]
+
+    def __init__(self, cls, state, children):
+        object.__setattr__(self, "cls", cls)
+        object.__setattr__(self, "state", state)
+        object.__setattr__(self, "children", children)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable.")
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.cls.__name__})"
+
+    def _step(self, step):
+        if isinstance(step, int):
+            name = self.cls._main_container
+            if name is None:
+                raise ValueError(f"{self.cls.__name__} has no main container.")
+            step = (name, step)
+
+        name, index = step
+        for position, child in enumerate(self.children):
+            if child[0] == name:
+                if index < 0:
+                    index += len(child[1])
+                return position, index
+        raise ValueError(f"{self.cls.__name__} has no child: {step[0]!r}.")
+
+    def _with_nodes(self, position, nodes):
+        name, _, oktypes, converter = self.children[position]
+        children = list(self.children)
+        children[position] = (name, nodes, oktypes, converter)
+        return FrozenElement(self.cls, self.state, tuple(children))
+
+    def _update(self, path, update):
+        """Return a new root with the container holding `path` updated.
+
+        `update` gets the nodes of the container, the index of the last step
+        and the container's oktypes and returns the new nodes.  Only the
+        elements along `path` are copied.
+        """
+        if not path:
+            raise ValueError("The path must not be empty.")
+
+        ancestors = self.ancestors(path[:-1])
+        node = ancestors[-1]
+        position, index = node._step(path[-1])
+        _, nodes, oktypes, _ = node.children[position]
+        new = node._with_nodes(position, update(nodes, index, oktypes))
+
+        for node, step in zip(reversed(ancestors[:-1]), reversed(path[:-1])):
+            position, index = node._step(step)
+            nodes = node.children[position][1]
+            new = node._with_nodes(
+                position, nodes[:index] + (new,) + nodes[index + 1 :]
+            )
+        return new
+
+    def get(self, path):
+        """Return the element at `path`.
+
+        :rtype: `FrozenElement`
+        """
+        return self.ancestors(path)[-1]
+
+    def ancestors(self, path):
+        """Return the elements from this one down to the one at `path`.
+
+        :rtype: list of `FrozenElement`
+        """
+        nodes = [self]
+        for step in path:
+            node = nodes[-1]
+            position, index = node._step(step)
+            nodes.append(node.children[position][1][index])
+        return nodes
+
+    def replace(self, path, element):
+        """Return a new tree with the element at `path` replaced.
+
+        :param element: Mutable elements are frozen first.
+        :type element: `FrozenElement` | `Element<pyposo.base.Element>`
+        :rtype: `FrozenElement`
+        """
+        element = _as_frozen(element)
+
+        def update(nodes, index, oktypes):
+            _check(element, oktypes)
+            nodes[index]  # Raise an IndexError for invalid indexes.
+            return nodes[:index] + (element,) + nodes[index + 1 :]
+
+        return self._update(path, update)
+
+    def insert(self, path, element):
+        """Return a new tree with `element` inserted before `path`.
+
+        The last step of `path` may be the length of the container, to
+        append `element`.
+
+        :type element: `FrozenElement` | `Element<pyposo.base.Element>`
+        :rtype: `FrozenElement`
+        """
+        element = _as_frozen(element)
+
+        def update(nodes, index, oktypes):
+            _check(element, oktypes)
+            return nodes[:index] + (element,) + nodes[index:]
+
+        return self._update(path, update)
+
+    def delete(self, path):
+        """Return a new tree without the element at `path`.
+
+        :rtype: `FrozenElement`
+        """
+
+        def update(nodes, index, oktypes):
+            nodes[index]  # Raise an IndexError for invalid indexes.
+            return nodes[:index] + nodes[index + 1 :]
+
+        return self._update(path, update)
+
+    def walk(self):
+        """Iterate over ``(path, element)`` pairs of this element and all
+        elements below it, in document order.
+        """
+        stack = [((), self)]
+        while stack:
+            path, node = stack.pop()
+            yield path, node
+            main = node.cls._main_container
+            for name, nodes, _, _ in reversed(node.children):
+                stack.extend(
+                    (path + ((i if name == main else (name, i)),), child)
+                    for i, child in reversed(list(enumerate(nodes)))
+                )
+
+    def thaw(self):
+        """Return a new mutable tree equal to this one.
+
+        Document indexes aren't part of frozen trees, enable them again on
+        the thawed document if needed.
+
+        :rtype: `Element<pyposo.base.Element>`
+        """
+        root = None
+        stack = [(self, None)]
+        while stack:
+            node, container = stack.pop()
+            cls = node.cls
+            element = cls.__new__(cls)
+            for name, value in _RESET_SLOTS.items():
+                if hasattr(cls, name):
+                    object.__setattr__(element, name, value)
+            for name, value in node.state:
+                object.__setattr__(element, name, value)
+
+            for name, nodes, oktypes, converter in node.children:
+                child_container = ListContainer(
+                    oktypes=oktypes,
+                    parent=element,
+                    location=name,
+                    converter=converter,
+                )
+                object.__setattr__(element, f"_{name}", child_container)
+                stack.extend((n, child_container) for n in reversed(nodes))
+
+            if container is None:
+                root = element
+            else:
+                container.list.append(element)
+                element.parent = container.parent
+                element.location = container.location
+
+        return root
+
+    def dump(self):
+        """Render this tree, like `Element.dump<pyposo.base.Element.dump>`.
+
+        :rtype: str
+        """
+        return self.thaw().dump()
+
+
+def _as_frozen(element):
+    if isinstance(element, FrozenElement):
+        return element
+    elif hasattr(type(element), "_children"):
+        return freeze(element)
+    raise TypeError(
+        f"Expected a FrozenElement or an Element, got: {type(element).__name__}."
+    )
+
+
+def _check(element, oktypes):
+    if not issubclass(element.cls, oktypes):
+        raise TypeError(
+            "The passed object is type: {type_}; expected one of: "
+            "{allowed_types}.".format(
+                type_=element.cls.__name__,
+                allowed_types=allowed_types_to_str(oktypes),
+            )
+        )
@@ -0,0 +1,136 @@
+"""
+HTML
+====
+
+Render documents straight to HTML, without the detour over
+reStructuredText and docutils.
+
+The output is a fragment (no ``<html>`` or ``<body>``) with the same
+structure docutils would produce for the rendered reStructuredText.
+"""
+from html import escape
+import re
+
+from .elements import plain_text
+from .utils import make_id
+from .writers import Writer
+
+_rst_escape = re.compile(r"\\(.)")
+
+_ol_types = {"1": "1", "#": "1", "a": "a", "A": "A", "i": "i", "I": "I"}
+
+
+class HTMLWriter(Writer):
+    """Renders elements to HTML."""
+
+    name = "html"
+    _heading_levels = {
+        "Title": 1,
+        "Section": 2,
+        "Subsection": 3,
+        "Subsubsection": 4,
+    }
+
+    def _inline(self, element, child="content"):
+        return "".join(self.render_children(element, child))
+
+    def _blocks(self, element, child="content"):
+        return "\n".join(self.render_children(element, child))
+
+    def visit_Document(self, document):
+        return self._blocks(document)
+
+    def visit_Str(self, str_):
+        string = str_.string
+        if str_.escaped:
+            string = _rst_escape.sub(r"\1", string)
+        return escape(string, quote=False)
+
+    def visit_Space(self, space):
+        return " "
+
+    def visit_LineBreak(self, line_break):
+        return "<br />\n"
+
+    def visit_Span(self, span):
+        return self._inline(span)
+
+    def visit_Emph(self, emph):
+        return f"<em>{self._inline(emph)}</em>"
+
+    def visit_Strong(self, strong):
+        return f"<strong>{self._inline(strong)}</strong>"
+
+    def visit_Target(self, target):
+        target_id = make_id(plain_text(target.content))
+        return f'<span id="{target_id}">{self._inline(target)}</span>'
+
+    def visit_Reference(self, reference):
+        text = self._inline(reference) or escape(reference.label)
+        return f'<a href="#{make_id(reference.label)}">{text}</a>'
+
+    def visit_Paragraph(self, paragraph):
+        return f"<p>{self._inline(paragraph)}</p>"
+
+    def visit_Plain(self, plain):
+        return self._inline(plain)
+
+    def visit_StreamParagraph(self, paragraph):
+        # Markup in the text isn't parsed, it's shown as is.
+        return f"<p>{escape(paragraph._plain_text(), quote=False)}</p>"
+
+    def visit__Section(self, section):
+        level = self._heading_levels.get(type(section).__name__, 2)
+        section_id = make_id(section.label or plain_text(section.title))
+        title = self._inline(section, "title")
+        content = self._blocks(section)
+        return (
+            f'<section id="{section_id}">\n'
+            f"<h{level}>{title}</h{level}>\n"
+            f"{content}{chr(10) if content else ''}</section>"
+        )
+
+    def visit__DivBlock(self, block):
+        title = self._inline(block, "title")
+        return (
+            f'<div class="{block._directive}">\n'
+            f'<p class="title">{title}</p>\n'
+            f"{self._blocks(block)}\n</div>"
+        )
+
+    def visit_LiteralBlock(self, block):
+        text = escape(block.read_text(), quote=False)
+        return f'<pre class="literal-block">{text}</pre>'
+
+    def visit_CodeBlock(self, block):
+        classes = " ".join(filter(None, ["code", block.language]))
+        text = escape(block.read_text(), quote=False)
+        return f'<pre class="{classes} literal-block">{text}</pre>'
+
+    def visit__ListItem(self, item):
+        return f"<li>{self._blocks(item)}</li>"
+
+    def visit_BulletList(self, list_):
+        return f"<ul>\n{self._blocks(list_)}\n</ul>"
+
+    def visit_EnumeratedList(self, list_):
+        _, kind, _ = list_._style
+        start = f' start="{list_.start}"' if list_.start != 1 else ""
+        return (
+            f'<ol type="{_ol_types[kind]}"{start}>\n'
+            f"{self._blocks(list_)}\n</ol>"
+        )
+
+    def visit_FieldListItem(self, item):
+        return (
+            f"<dt>{self._inline(item, 'term')}</dt>\n"
+            f"<dd>{self._blocks(item)}</dd>"
+        )
+
+    def visit_FieldList(self, list_):
+        return f'<dl class="field-list">\n{self._blocks(list_)}\n</dl>'
+
+
+def dump_html(element):
+    """Render `element` to HTML with a `HTMLWriter`."""
+    return HTMLWriter().render(element)
@@ -0,0 +1,154 @@
+"""
+Index
+=====
+
+Indexes of the elements of a document, kept up to date while it changes.
+
+An index is enabled with
+:meth:`Document.enable_index<pyposo.elements.Document.enable_index>`.  From
+then on every element added to or removed from the document, through any
+of the mutating methods of `ListContainer<pyposo.containers.ListContainer>`,
+is added to or removed from the index.  As long as no document has an
+index, the containers skip this bookkeeping entirely.
+"""
+import weakref
+
+from . import containers
+from .elements import _Section, plain_text
+from .utils import make_id
+
+
+def _release():
+    containers._active_indexes -= 1
+
+
+def _add(mapping, key, element):
+    mapping.setdefault(key, {})[id(element)] = element
+
+
+def _discard(mapping, key, element):
+    elements = mapping.get(key)
+    if elements is not None:
+        elements.pop(id(element), None)
+        if not elements:
+            del mapping[key]
+
+
+class DocumentIndex:
+    """Lookups of the elements of a document in constant time.
+
+    Lookups return elements in the order they were added, which is the
+    document order for documents that were built front to back.
+
+    Section titles are indexed with the text they have when the section,
+    or an element of its title, is added; changing a `Str` of a title in
+    place requires a `rebuild`.
+    """
+
+    def __init__(self, document):
+        self.document = document
+        self.rebuild()
+
+    def rebuild(self):
+        """Index the whole document from scratch."""
+        self._by_class = {}
+        self._by_title = {}
+        self._by_slug = {}
+        self._by_label = {}
+        self._section_keys = {}
+        for element in self.document.walk():
+            if element is not self.document:
+                self._add_element(element)
+
+    def _add_element(self, element):
+        _add(self._by_class, type(element), element)
+        if isinstance(element, _Section):
+            self._add_section(element)
+
+    def _remove_element(self, element):
+        _discard(self._by_class, type(element), element)
+        if isinstance(element, _Section):
+            self._remove_section(element)
+
+    def _add_section(self, section):
+        title = plain_text(section.title)
+        keys = (title, make_id(title), section.label)
+        self._section_keys[id(section)] = keys
+
+        _add(self._by_title, keys[0], section)
+        _add(self._by_slug, keys[1], section)
+        if keys[2] is not None:
+            _add(self._by_label, keys[2], section)
+
+    def _remove_section(self, section):
+        keys = self._section_keys.pop(id(section), None)
+        if keys is None:
+            return
+
+        _discard(self._by_title, keys[0], section)
+        _discard(self._by_slug, keys[1], section)
+        _discard(self._by_label, keys[2], section)
+
+    def _added(self, container, elements):
+        for element in elements:
+            for e in element.walk():
+                self._add_element(e)
+        self._title_changed(container)
+
+    def _removed(self, container, elements):
+        for element in elements:
+            for e in element.walk():
+                self._remove_element(e)
+        self._title_changed(container)
+
+    def _title_changed(self, container):
+        section = container.parent
+        if container.location == "title" and id(section) in self._section_keys:
+            self._remove_section(section)
+            self._add_section(section)
+
+    def of_type(self, cls):
+        """Return all elements which are instances of `cls`.
+
+        :type cls: type
+        :rtype: list
+        """
+        return [
+            element
+            for klass, elements in self._by_class.items()
+            if issubclass(klass, cls)
+            for element in elements.values()
+        ]
+
+    def sections(self, title):
+        """Return all sections with the title `title` (without markup).
+
+        :rtype: list of `_Section<pyposo.elements._Section>`
+        """
+        return list(self._by_title.get(title, {}).values())
+
+    def sections_by_slug(self, slug):
+        """Return all sections whose title turns into the id `slug`.
+
+        :rtype: list of `_Section<pyposo.elements._Section>`
+        """
+        return list(self._by_slug.get(slug, {}).values())
+
+    def label(self, label):
+        """Return the element with the label `label`.
+
+        :raises KeyError: If there's no such element.
+        """
+        try:
+            return next(iter(self._by_label[label].values()))
+        except KeyError:
+            raise KeyError(f"No element with the label: {label!r}.") from None
+
+    def _enable(self):
+        containers._active_indexes += 1
+        # Documents which are freed with their index enabled don't count
+        # anymore either.
+        self._finalizer = weakref.finalize(self.document, _release)
+
+    def _disable(self):
+        self._finalizer()
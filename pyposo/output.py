@@ -0,0 +1,204 @@
+"""
+Output
+======
+
+Writing many documents to files, touching only those which changed.
+
+The fingerprints of the documents and hashes of the written files are kept
+in a manifest, so that documents which didn't change since the last run
+aren't even rendered and files whose content didn't change aren't
+rewritten (which keeps their modification times, and thereby the caches of
+tools like Sphinx or rsync, intact).
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+import tempfile
+
+from .version import __version__
+
+
+def _hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+_umask = None
+
+
+def _new_file_mode():
+    """Return the mode ``open`` gives new files, with the current umask."""
+    # The umask can only be read by setting it.  It's read once, changing
+    # it back and forth while other threads create files would be racy.
+    global _umask
+    if _umask is None:
+        _umask = os.umask(0)
+        os.umask(_umask)
+    return 0o666 & ~_umask
+
+
+def _write_atomically(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as file_:
+            file_.write(data)
+        # Temporary files are only readable by their owner, the file gets the
+        # mode it had, or would get from ``open``, instead.
+        try:
+            mode = os.stat(path).st_mode & 0o7777
+        except FileNotFoundError:
+            mode = _new_file_mode()
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _write_if_changed(path, data, output_hash, known_hash=None):
+    """Write `data` to `path` unless the file already contains it.
+
+    :param known_hash: The hash of the file's content, if it's known; the
+        file is read and compared otherwise.
+    :returns: Whether the file was written.
+    """
+    if known_hash is not None:
+        needs_writing = output_hash != known_hash
+    else:
+        try:
+            needs_writing = path.read_bytes() != data
+        except FileNotFoundError:
+            needs_writing = True
+
+    if needs_writing:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _write_atomically(path, data)
+    return needs_writing
+
+
+class Manifest:
+    """The hashes of all files written by `write_documents`.
+
+    :param path: The JSON file the manifest is stored in, it is created by
+        `save` if it doesn't exist.
+    :type path: str | pathlib.Path
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        try:
+            with open(self.path, encoding="utf-8") as file_:
+                self.entries = json.load(file_)
+        except FileNotFoundError:
+            self.entries = {}
+
+    def is_current(self, path):
+        """Whether `path` still is the file we wrote last time.
+
+        :rtype: bool
+        """
+        entry = self.entries.get(str(path))
+        if entry is None:
+            return False
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return False
+        return [stat.st_size, stat.st_mtime_ns] == entry["stat"]
+
+    def update(self, path, input_hash, output_hash):
+        stat = path.stat()
+        self.entries[str(path)] = {
+            "input": input_hash,
+            "output": output_hash,
+            "stat": [stat.st_size, stat.st_mtime_ns],
+        }
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(self.entries, indent=1, sort_keys=True)
+        _write_atomically(self.path, data.encode("utf-8"))
+
+
+class WriteReport:
+    """What `write_documents` did with each of the paths.
+
+    :ivar written: Files which were (re)written.
+    :ivar unchanged: Documents which were rendered, but the file already had
+        the same content.
+    :ivar skipped: Documents which weren't rendered since their fingerprint
+        didn't change.
+    """
+
+    __slots__ = ["written", "unchanged", "skipped"]
+
+    def __init__(self):
+        self.written = []
+        self.unchanged = []
+        self.skipped = []
+
+    def __repr__(self):
+        return "{tag}(written={}, unchanged={}, skipped={})".format(
+            len(self.written),
+            len(self.unchanged),
+            len(self.skipped),
+            tag=type(self).__name__,
+        )
+
+
+def write_documents(
+    documents, manifest, directory=None, encoding="utf-8", force=False
+):
+    """Render `documents` to files, skipping everything that is up to date.
+
+    A document is only rendered if its
+    `fingerprint<pyposo.base.Element.fingerprint>` differs from the one in
+    the manifest or its file was changed by somebody else.  A rendered
+    document is only written if the file doesn't contain the same text
+    already.
+
+    :param documents: Paths and the documents to write to them.
+    :type documents: dict | iterable of (path, `Document`) pairs
+    :param manifest: The manifest, or the path to the manifest file.  It is
+        saved after all documents have been written.
+    :type manifest: `Manifest` | str | pathlib.Path
+    :param directory: Relative paths are relative to this directory.
+    :type directory: str | pathlib.Path
+    :param force: Render and compare all documents, ignoring the
+        fingerprints in the manifest.
+    :type force: bool
+    :rtype: `WriteReport`
+    """
+    if not isinstance(manifest, Manifest):
+        manifest = Manifest(manifest)
+    if isinstance(documents, dict):
+        documents = documents.items()
+
+    directory = Path(directory or ".")
+    report = WriteReport()
+
+    try:
+        for path, document in documents:
+            path = directory / path
+            input_hash = f"{__version__}:{document.fingerprint()}"
+
+            entry = manifest.entries.get(str(path))
+            is_current = manifest.is_current(path)
+            if not force and is_current and entry["input"] == input_hash:
+                report.skipped.append(path)
+                continue
+
+            data = document.dump().encode(encoding)
+            output_hash = _hash_bytes(data)
+            known_hash = entry["output"] if is_current else None
+
+            if _write_if_changed(path, data, output_hash, known_hash):
+                report.written.append(path)
+            else:
+                report.unchanged.append(path)
+
+            manifest.update(path, input_hash, output_hash)
+    finally:
+        manifest.save()
+
+    return report
@@ -0,0 +1,333 @@
+"""
+Render Server
+=============
+
+A local HTTP service which renders document specs, so that tools get
+reStructuredText or HTML without starting Python and importing pyposo for
+every document::
+
+    python -m pyposo.server --port 8080 --workers 4
+
+``POST /render`` with a JSON spec (see :mod:`pyposo.spec`) as body returns
+the document as reStructuredText, ``POST /render?format=html`` as HTML.
+Documents are rendered by a pool of worker processes, which are started
+(and warmed up) with the server.  They are rendered completely before the
+response starts, and then sent with chunked transfer encoding.
+Rendered documents are kept in a least recently used cache, keyed by the
+hash of their spec, so rendering the same spec again only costs the
+request.  ``GET /stats`` returns the counters of the server as JSON.
+Elements which read or write files, like `LiteralBlock
+<pyposo.elements.LiteralBlock>`, can't be used in the specs.
+
+Only the standard library is used.  The server has no authentication, it
+binds to localhost by default and shouldn't be reachable from elsewhere.
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import sys
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from . import elements
+from .cache import MemoryCache
+from .html import dump_html
+from .spec import _classes, _hash_spec, from_spec
+
+_CONTENT_TYPES = {
+    "rst": "text/x-rst; charset=utf-8",
+    "html": "text/html; charset=utf-8",
+}
+# The size of the chunks responses are sent in.
+_CHUNK_SIZE = 2 ** 16
+# The element classes specs may use.  Elements which read or write files
+# are left out, clients mustn't get at the files of the server.
+_SERVED_CLASSES = {
+    name: cls
+    for name, cls in _classes.items()
+    if not issubclass(cls, (elements._FileBlock, elements.StreamingDocument))
+}
+
+
+def _render(spec, format_):
+    element = from_spec(spec, _SERVED_CLASSES)
+    text = dump_html(element) if format_ == "html" else element.dump()
+    return text.encode("utf-8")
+
+
+def _warm_up():
+    """Import and run everything rendering needs once."""
+    for format_ in _CONTENT_TYPES:
+        _render({"type": "Document", "content": ["Warming up."]}, format_)
+
+
+class _Counters:
+    """Request counters, shared by the threads of the server."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.bytes_sent = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds, bytes_sent=0, error=False, cache_hit=None):
+        with self._lock:
+            self.requests += 1
+            self.errors += error
+            if cache_hit is not None:
+                if cache_hit:
+                    self.cache_hits += 1
+                else:
+                    self.cache_misses += 1
+            self.bytes_sent += bytes_sent
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+
+    def as_dict(self):
+        with self._lock:
+            uptime = time.monotonic() - self.started
+            return {
+                "uptime": uptime,
+                "requests": self.requests,
+                "errors": self.errors,
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+                "bytes_sent": self.bytes_sent,
+                "requests_per_second": self.requests / uptime if uptime else 0,
+                "mean_latency_ms": (
+                    self.total_seconds / self.requests * 1000
+                    if self.requests
+                    else 0
+                ),
+                "max_latency_ms": self.max_seconds * 1000,
+            }
+
+
+class _RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "pyposo"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_body(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, error, start):
+        body = json.dumps({"error": str(error)}).encode("utf-8")
+        self.server.counters.record(
+            time.perf_counter() - start, len(body), error=True
+        )
+        self._send_body(error.status, "application/json", body)
+
+    def _send_chunked(self, content_type, data, cache_hit, start):
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("X-Pyposo-Cache", "hit" if cache_hit else "miss")
+        self.end_headers()
+        view = memoryview(data)
+        for offset in range(0, len(view), _CHUNK_SIZE):
+            chunk = view[offset : offset + _CHUNK_SIZE]
+            self.wfile.write(b"%x\r\n" % len(chunk))
+            self.wfile.write(chunk)
+            self.wfile.write(b"\r\n")
+        # Count the request before the client sees its end.
+        self.server.counters.record(
+            time.perf_counter() - start, len(data), cache_hit=cache_hit
+        )
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self):
+        start = time.perf_counter()
+        if urlsplit(self.path).path != "/stats":
+            error = _RequestError(HTTPStatus.NOT_FOUND, "Not found.")
+            self._send_error(error, start)
+            return
+
+        body = json.dumps(self.server.counters.as_dict()).encode("utf-8")
+        self.server.counters.record(time.perf_counter() - start, len(body))
+        self._send_body(HTTPStatus.OK, "application/json", body)
+
+    def do_POST(self):
+        start = time.perf_counter()
+        try:
+            format_, spec = self._read_request()
+            data, cache_hit = self.server.render(spec, format_)
+        except _RequestError as error:
+            self._send_error(error, start)
+            return
+
+        self._send_chunked(_CONTENT_TYPES[format_], data, cache_hit, start)
+
+    def _read_request(self):
+        url = urlsplit(self.path)
+        try:
+            length = int(self.headers["Content-Length"])
+            if length < 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            # The end of the body isn't known, so the connection can't be
+            # used for further requests.
+            self.close_connection = True
+            raise _RequestError(
+                HTTPStatus.BAD_REQUEST,
+                "A valid Content-Length header is required.",
+            ) from None
+        body = self.rfile.read(length)
+        if url.path != "/render":
+            raise _RequestError(HTTPStatus.NOT_FOUND, "Not found.")
+
+        format_ = parse_qs(url.query).get("format", ["rst"])[-1]
+        if format_ not in _CONTENT_TYPES:
+            raise _RequestError(
+                HTTPStatus.BAD_REQUEST, f"Unknown format: {format_!r}."
+            )
+        try:
+            spec = json.loads(body)
+        except ValueError as error:
+            raise _RequestError(
+                HTTPStatus.BAD_REQUEST, f"Invalid JSON: {error}"
+            ) from None
+        if not isinstance(spec, dict):
+            raise _RequestError(
+                HTTPStatus.BAD_REQUEST, "The spec must be a JSON object."
+            )
+        return format_, spec
+
+
+class RenderServer(ThreadingHTTPServer):
+    """An HTTP server rendering document specs, see :mod:`pyposo.server`.
+
+    Every request is handled in its own thread, the documents are rendered
+    by the worker processes.
+
+    :param address: The ``(host, port)`` to listen on, port ``0`` picks a
+        free port.
+    :type address: tuple
+    :param workers: The number of worker processes, ``0`` renders in the
+        threads of the server instead.
+    :type workers: int
+    :param cache_size: The number of bytes of rendered documents to cache.
+    :type cache_size: int
+    :param verbose: Whether to log every request to stderr.
+    :type verbose: bool
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address=("127.0.0.1", 8000),
+        workers=None,
+        cache_size=2 ** 26,
+        verbose=False,
+    ):
+        super().__init__(address, _Handler)
+        self.cache = MemoryCache(cache_size)
+        self.counters = _Counters()
+        self.verbose = verbose
+
+        if workers == 0:
+            self.executor = None
+            _warm_up()
+        else:
+            workers = workers or os.cpu_count()
+            self.executor = ProcessPoolExecutor(workers, initializer=_warm_up)
+            # Start all workers now, instead of with the first requests.
+            futures = [self.executor.submit(int) for _ in range(workers)]
+            for future in futures:
+                future.result()
+
+    def render(self, spec, format_="rst"):
+        """Return the rendered `spec` and whether it came from the cache.
+
+        :rtype: tuple(bytes, bool)
+        """
+        key = f"{format_}:{_hash_spec(spec)}"
+        data = self.cache.get(key)
+        if data is not None:
+            return data, True
+
+        try:
+            if self.executor is None:
+                data = _render(spec, format_)
+            else:
+                data = self.executor.submit(_render, spec, format_).result()
+        except (ValueError, TypeError) as error:
+            raise _RequestError(HTTPStatus.BAD_REQUEST, error) from None
+        except Exception as error:
+            raise _RequestError(
+                HTTPStatus.INTERNAL_SERVER_ERROR, error
+            ) from None
+
+        self.cache.set(key, data)
+        return data, False
+
+    def server_close(self):
+        super().server_close()
+        if self.executor is not None:
+            self.executor.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m pyposo.server",
+        description="Serve rendered document specs over HTTP.",
+    )
+    parser.add_argument(
+        "--host", default="127.0.0.1", help="default: 127.0.0.1"
+    )
+    parser.add_argument("-p", "--port", type=int, default=8000)
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="number of worker processes (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=2 ** 26,
+        help="bytes of rendered documents to cache (default: 64 MiB)",
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="log every request"
+    )
+    args = parser.parse_args(argv)
+
+    with RenderServer(
+        (args.host, args.port), args.workers, args.cache_size, args.verbose
+    ) as server:
+        host, port = server.server_address[:2]
+        print(f"Serving on http://{host}:{port}/", file=sys.stderr, flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+Specs
+=====
+
+Build documents from declarative descriptions, e.g. loaded from JSON or
+YAML.
+
+An element is described by a mapping with its class name under ``type``.
+The other keys are the arguments of the class: the content goes under
+``content`` (or ``items`` for lists), everything else under the name of
+the argument.  Strings in the content of documents, sections and
+directives become paragraphs, all other strings are passed on as is, so
+they are converted like strings passed to the classes directly::
+
+    {
+        "type": "Document",
+        "textwidth": 79,
+        "content": [
+            {"type": "Section", "title": "Intro", "label": "intro",
+             "content": ["Some text.", {"type": "BulletList", "items": [
+                 {"type": "ListItem", "content": ["An item."]}]}]},
+        ],
+    }
+
+A spec file contains such a document, or a list of them.  Documents may
+name the file they are rendered to under ``output``.
+"""
+import hashlib
+import inspect
+import json
+from pathlib import Path
+import re
+
+from . import elements
+from .base import Element
+from .version import __version__
+
+_CONTENT_KEYS = ("content", "items")
+_BLOCK_CONTAINERS = (elements.Document, elements._Section, elements._DivBlock)
+
+
+def _element_classes():
+    return {
+        name: cls
+        for name, cls in vars(elements).items()
+        if isinstance(cls, type)
+        and issubclass(cls, Element)
+        and not name.startswith("_")
+    }
+
+
+_classes = _element_classes()
+_PARAMETER = re.compile(r"^\s*:param (\w+):", re.MULTILINE)
+
+
+def _documented_parameters(cls):
+    """Return the names of the ``:param:`` entries of the docstring of `cls`."""
+    return set(_PARAMETER.findall(cls.__doc__ or "")) - {"args"}
+
+
+def _convert(value, classes):
+    if isinstance(value, dict):
+        return from_spec(value, classes)
+    elif isinstance(value, list):
+        return [_convert(v, classes) for v in value]
+    else:
+        return value
+
+
+def _hash_spec(spec):
+    data = json.dumps(spec, sort_keys=True, ensure_ascii=False)
+    return f"{__version__}:{hashlib.sha256(data.encode('utf-8')).hexdigest()}"
+
+
+def from_spec(spec, classes=None):
+    """Build the element described by `spec`.
+
+    :type spec: dict
+    :param classes: The element classes `spec` may use, by name, all public
+        classes of :mod:`pyposo.elements` by default.
+    :type classes: dict
+    :raises ValueError: For unknown types or arguments.
+    :rtype: `Element<pyposo.base.Element>`
+    """
+    if classes is None:
+        classes = _classes
+    spec = dict(spec)
+    type_name = spec.pop("type", "Document")
+    spec.pop("output", None)
+    try:
+        cls = classes[type_name]
+    except KeyError:
+        raise ValueError(f"Unknown element type: {type_name!r}.") from None
+
+    content = []
+    for key in _CONTENT_KEYS:
+        content.extend(_convert(spec.pop(key, []), classes))
+    if issubclass(cls, _BLOCK_CONTAINERS):
+        content = [
+            elements.Paragraph(c) if isinstance(c, str) else c
+            for c in content
+        ]
+
+    args = []
+    kwargs = {}
+    positional = []
+    takes_content = False
+    parameters = list(inspect.signature(cls.__init__).parameters.values())
+    for parameter in parameters[1:]:
+        name = parameter.name
+        if parameter.kind is parameter.VAR_POSITIONAL:
+            takes_content = True
+            args = [kwargs.pop(n) for n in positional]
+        elif parameter.kind is parameter.VAR_KEYWORD:
+            # Only the documented arguments, so misspelled ones aren't
+            # silently ignored.
+            for key in _documented_parameters(cls) & spec.keys():
+                kwargs[key] = _convert(spec.pop(key), classes)
+        elif name in spec:
+            kwargs[name] = _convert(spec.pop(name), classes)
+            positional.append(name)
+        elif parameter.default is parameter.empty:
+            raise ValueError(f"{type_name} needs the argument: {name}.")
+
+    if spec:
+        raise ValueError(
+            f"Unknown arguments for {type_name}: {', '.join(sorted(spec))}."
+        )
+    if content and not takes_content:
+        raise ValueError(f"{type_name} takes no content.")
+
+    return cls(*args, *content, **kwargs)
+
+
+def load_specs(path):
+    """Load the document specs of a JSON or YAML file.
+
+    YAML files (``.yaml`` or ``.yml``) need PyYAML.
+
+    :rtype: list of dict
+    """
+    path = Path(path)
+    with open(path, encoding="utf-8") as file_:
+        if path.suffix in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError:
+                raise RuntimeError(
+                    f"PyYAML is needed to load YAML specs: {path}"
+                ) from None
+            specs = yaml.safe_load(file_)
+        else:
+            specs = json.load(file_)
+
+    return specs if isinstance(specs, list) else [specs]
@@ -0,0 +1,161 @@
+"""
+Statistics
+==========
+
+Size and structure of element trees, see `Element.stats
+<pyposo.base.Element.stats>`.
+"""
+import heapq
+from sys import getsizeof
+
+# Slots which don't hold data of the element itself.
+_SKIPPED_SLOTS = {"_parent", "location", "__weakref__"}
+_slot_descriptors = {}
+
+
+def _descriptors(cls):
+    """Return the descriptors of all data slots of `cls`, computed once."""
+    try:
+        return _slot_descriptors[cls]
+    except KeyError:
+        pass
+
+    children = {f"_{name}" for name in cls._children}
+    descriptors = []
+    for base in cls.__mro__:
+        for name in base.__dict__.get("__slots__", ()):
+            if name not in _SKIPPED_SLOTS and name not in children:
+                descriptors.append(base.__dict__[name])
+    _slot_descriptors[cls] = descriptors
+    return descriptors
+
+
+class TreeStats:
+    """The size and structure of an element tree.
+
+    :ivar counts: The number of elements per class name.
+    :ivar max_depth: The depth of the deepest element, the element the
+        statistics were made for has depth 0.
+    :ivar largest_containers: ``(length, element, child name)`` tuples of the
+        containers with the most elements, the largest first.
+    :ivar text_bytes: The UTF-8 size of all strings held by the elements.
+    :ivar memory: An estimate of the memory used by the elements, their
+        containers and strings in bytes.
+    """
+
+    __slots__ = [
+        "counts",
+        "max_depth",
+        "largest_containers",
+        "text_bytes",
+        "memory",
+    ]
+
+    def __init__(self):
+        self.counts = {}
+        self.max_depth = 0
+        self.largest_containers = []
+        self.text_bytes = 0
+        self.memory = 0
+
+    @property
+    def nodes(self):
+        """The total number of elements."""
+        return sum(self.counts.values())
+
+    def as_dict(self):
+        """Return the statistics as a dict which can be serialized to JSON.
+
+        Containers are described by ``"ElementClass.child"`` strings.
+
+        :rtype: dict
+        """
+        return {
+            "nodes": self.nodes,
+            "counts": dict(self.counts),
+            "max_depth": self.max_depth,
+            "largest_containers": [
+                [length, f"{type(element).__name__}.{name}"]
+                for length, element, name in self.largest_containers
+            ],
+            "text_bytes": self.text_bytes,
+            "memory": self.memory,
+        }
+
+    def __repr__(self):
+        return "{tag}(nodes={}, max_depth={}, text_bytes={}, memory={})".format(
+            self.nodes,
+            self.max_depth,
+            self.text_bytes,
+            self.memory,
+            tag=type(self).__name__,
+        )
+
+
+def tree_stats(element, largest=10):
+    """Collect the `TreeStats` of `element` and everything below it.
+
+    The tree is walked once, without recursion.
+
+    :param largest: How many of the largest containers to keep.
+    :type largest: int
+    :rtype: `TreeStats`
+    """
+    stats = TreeStats()
+    counts = stats.counts
+    # A min-heap of the largest containers, the counter breaks ties so that
+    # elements are never compared.
+    heap = []
+    seen_strings = set()
+    counter = 0
+    max_depth = 0
+    text_bytes = 0
+    memory = 0
+
+    stack = [(element, 0)]
+    while stack:
+        e, depth = stack.pop()
+        cls = type(e)
+        name = cls.__name__
+        counts[name] = counts.get(name, 0) + 1
+        if depth > max_depth:
+            max_depth = depth
+        memory += getsizeof(e)
+
+        for descriptor in _descriptors(cls):
+            try:
+                value = descriptor.__get__(e, cls)
+            except AttributeError:
+                continue
+            if isinstance(value, str):
+                text_bytes += (
+                    len(value) if value.isascii() else len(value.encode())
+                )
+                # Equal strings are often shared (e.g. interned words).
+                if id(value) not in seen_strings:
+                    seen_strings.add(id(value))
+                    memory += getsizeof(value)
+
+        for child in e._children:
+            container = getattr(e, f"_{child}")
+            children = container.list
+            memory += getsizeof(container) + getsizeof(children)
+
+            length = len(children)
+            if length:
+                counter += 1
+                entry = (length, counter, e, child)
+                if len(heap) < largest:
+                    heapq.heappush(heap, entry)
+                elif heap and length > heap[0][0]:
+                    heapq.heapreplace(heap, entry)
+                stack.extend((c, depth + 1) for c in children)
+
+    stats.max_depth = max_depth
+    stats.text_bytes = text_bytes
+    stats.memory = memory
+    stats.largest_containers = [
+        (length, e, child)
+        for length, _, e, child in sorted(heap, key=lambda x: (-x[0], x[1]))
+    ]
+    return stats
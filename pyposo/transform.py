@@ -0,0 +1,129 @@
+"""
+Transformations
+===============
+
+Rewrite element trees with filters, in the spirit of Panflute, see
+`Element.transform<pyposo.base.Element.transform>`.
+
+A filter is a callable which gets an element and returns
+
+* ``None`` to keep the element,
+* an element to replace it with,
+* a list of elements to replace it with, ``[]`` deletes it.
+
+Filters are called for the element classes they are registered for with
+`applies_to`, filters without classes are called for every element::
+
+    @applies_to(Emph)
+    def strip_emph(emph):
+        return list(emph.content)
+
+    @applies_to(Subsection)
+    def promote(subsection):
+        return Section(list(subsection.title), *subsection.content)
+
+    document.transform(strip_emph, promote)
+
+All filters run in one walk over the tree: children are transformed before
+their parents, and each element is passed to the filters in the order they
+were given.  When a filter replaces an element, the following filters get
+the replacements (if they apply to them), the children of replacements
+aren't walked though.
+"""
+
+
+def applies_to(*classes):
+    """Register the decorated filter for elements of `classes`.
+
+    Subclasses are included, e.g. a filter for `_Section
+    <pyposo.elements._Section>` gets every kind of section.
+    """
+
+    def decorator(function):
+        function.pyposo_classes = classes
+        return function
+
+    return decorator
+
+
+class _DispatchTable:
+    """Maps element classes to the filters for them.
+
+    The filters for a class are found through its MRO once, when the first
+    element of the class is seen.
+    """
+
+    def __init__(self, filters):
+        self.filters = [
+            (getattr(f, "pyposo_classes", None) or (object,), f)
+            for f in filters
+        ]
+        self.table = {}
+
+    def __getitem__(self, cls):
+        try:
+            return self.table[cls]
+        except KeyError:
+            pass
+
+        mro = set(cls.__mro__)
+        entries = tuple(
+            (position, f)
+            for position, (classes, f) in enumerate(self.filters)
+            if mro.intersection(classes)
+        )
+        self.table[cls] = entries
+        return entries
+
+    def apply(self, element, start=0):
+        """Return the elements which `element` is replaced with."""
+        for position, filter_ in self[type(element)]:
+            if position < start:
+                continue
+            result = filter_(element)
+            if result is None or result is element:
+                continue
+            if not isinstance(result, (list, tuple)):
+                result = [result]
+            replaced = []
+            for new in result:
+                replaced.extend(self.apply(new, position + 1))
+            return replaced
+        return [element]
+
+
+def transform(element, *filters):
+    """Run `filters` over all elements below `element`, in one walk.
+
+    The tree is walked without recursion and changed in place, through the
+    `ListContainer<pyposo.containers.ListContainer>` of each changed
+    element, so the types of replacements are checked as usual.
+
+    :raises TypeError: If a replacement doesn't fit the container.
+    """
+    table = _DispatchTable(filters)
+
+    # Parents come before their children in `order`, so walking it backwards
+    # transforms all children before their parents.
+    order = []
+    stack = [element]
+    while stack:
+        e = stack.pop()
+        order.append(e)
+        for name in e._children:
+            stack.extend(getattr(e, f"_{name}").list)
+
+    for e in reversed(order):
+        for name in e._children:
+            container = getattr(e, f"_{name}")
+            children = container.list
+            if not any(table[type(c)] for c in children):
+                continue
+
+            new = []
+            for child in children:
+                new.extend(table.apply(child))
+            if len(new) != len(children) or any(
+                a is not b for a, b in zip(new, children)
+            ):
+                container[:] = new
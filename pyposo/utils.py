@@ -1,3 +1,13 @@
+from functools import lru_cache
+import os
+import re
+import sys
+import textwrap
+import unicodedata
+
+_PACKAGE_DIRECTORY = os.path.dirname(os.path.abspath(__file__)) + os.sep
+
+
 def allowed_types_to_str(allowed_types, delimiter=", "):
     if isinstance(allowed_types, tuple):
         return delimiter.join(t.__name__ for t in allowed_types)
@@ -5,6 +15,22 @@ def allowed_types_to_str(allowed_types, delimiter=", "):
         return allowed_types.__name__
 
 
+def _caller_stacklevel():
+    """Return the ``stacklevel`` of the first caller outside of pyposo.
+
+    Warnings passed it point at the code which called pyposo, no matter
+    how many of its functions are in between.
+    """
+    level = 1
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_code.co_filename.startswith(
+        _PACKAGE_DIRECTORY
+    ):
+        frame = frame.f_back
+        level += 1
+    return level
+
+
 def check_type(element, allowed_types, message=None, checker=isinstance):
     if message is None:
         message = ('The passed object is type: {type_}; '
@@ -17,3 +43,176 @@ def check_type(element, allowed_types, message=None, checker=isinstance):
         ))
     else:
         return element
+
+
+# The backslash has to come first, so that the backslashes added for the
+# other characters aren't escaped again.
+_RST_ESCAPES = tuple(
+    (character, "\\" + character) for character in "\\*`|_"
+)
+
+
+def escape_rst(text):
+    """Escape the characters reStructuredText uses for inline markup.
+
+    Backslashes, ``*``, backticks, ``|`` and ``_`` are prefixed by a
+    backslash.  A chain of :meth:`str.replace` calls, each a single pass in
+    C, is several times faster than :meth:`str.translate` or a regular
+    expression here.
+    """
+    for character, escaped in _RST_ESCAPES:
+        if character in text:
+            text = text.replace(character, escaped)
+    return text
+
+
+def escape_rst_batch(texts):
+    """Escape all of `texts` at once, see :func:`escape_rst`.
+
+    :type texts: list of str
+    :rtype: list of str
+    """
+    if not texts:
+        return []
+
+    joined = "\0".join(texts)
+    if joined.count("\0") != len(texts) - 1:
+        return [escape_rst(text) for text in texts]
+    return escape_rst(joined).split("\0")
+
+
+_non_id_chars = re.compile(r"[^\w]+")
+
+
+def make_id(text):
+    """Turn `text` into an identifier like the slugs docutils uses for ids.
+
+    >>> make_id("A Section's Title")
+    'a-section-s-title'
+    """
+    return _non_id_chars.sub("-", text.lower()).strip("-_")
+
+
+def normalize_name(name):
+    """Normalize a reference name the way reStructuredText does.
+
+    Reference names are compared case insensitively and with all runs of
+    whitespace turned into single spaces.
+    """
+    return " ".join(name.lower().split())
+
+
+# The display widths of the non-ASCII characters seen so far.
+_char_widths = {}
+
+
+def _char_width(character):
+    try:
+        return _char_widths[character]
+    except KeyError:
+        pass
+
+    if unicodedata.combining(character) or unicodedata.category(
+        character
+    ) in ("Mn", "Me", "Cf"):
+        width = 0
+    elif unicodedata.east_asian_width(character) in ("W", "F"):
+        width = 2
+    else:
+        width = 1
+    _char_widths[character] = width
+    return width
+
+
+@lru_cache(maxsize=2 ** 16)
+def _non_ascii_width(text):
+    return sum(map(_char_width, text))
+
+
+def display_width(text):
+    """Return the number of columns `text` takes up in a monospaced font.
+
+    Wide characters, like those of CJK scripts and most emoji, take up two
+    columns, combining marks and other zero width characters none.  This is
+    how docutils measures title underlines, too.  ASCII text is measured
+    with ``len``, the widths of other strings are cached.
+
+    >>> display_width("Title"), display_width("表題")
+    (5, 4)
+    """
+    if text.isascii():
+        return len(text)
+    return _non_ascii_width(text)
+
+
+def _fitting_prefix(text, columns):
+    """Return how many characters of `text` fit into `columns`."""
+    width = 0
+    for position, character in enumerate(text):
+        width += _char_width(character)
+        if width > columns:
+            return position
+    return len(text)
+
+
+class _DisplayWidthWrapper(textwrap.TextWrapper):
+    """A :class:`textwrap.TextWrapper` which measures text in columns.
+
+    Text which isn't pure ASCII is measured with `display_width` instead of
+    ``len``, pure ASCII text is wrapped by :class:`textwrap.TextWrapper`
+    itself.  ``max_lines`` isn't supported.
+    """
+
+    def wrap(self, text):
+        self._ascii = text.isascii()
+        return super().wrap(text)
+
+    def _wrap_chunks(self, chunks):
+        if self._ascii:
+            return super()._wrap_chunks(chunks)
+
+        lines = []
+        chunks.reverse()
+        while chunks:
+            line = []
+            length = 0
+            indent = self.subsequent_indent if lines else self.initial_indent
+            width = self.width - display_width(indent)
+
+            if self.drop_whitespace and chunks[-1].strip() == "" and lines:
+                del chunks[-1]
+
+            while chunks:
+                chunk_width = display_width(chunks[-1])
+                if length + chunk_width > width:
+                    break
+                line.append(chunks.pop())
+                length += chunk_width
+
+            if chunks and display_width(chunks[-1]) > width:
+                self._handle_long_word(chunks, line, length, width)
+
+            if self.drop_whitespace and line and line[-1].strip() == "":
+                del line[-1]
+
+            if line:
+                lines.append(indent + "".join(line))
+        return lines
+
+    def _handle_long_word(self, reversed_chunks, line, length, width):
+        if self._ascii:
+            return super()._handle_long_word(
+                reversed_chunks, line, length, width
+            )
+
+        columns = 1 if width < 1 else width - length
+        if self.break_long_words:
+            chunk = reversed_chunks[-1]
+            end = _fitting_prefix(chunk, columns)
+            if not end and not line:
+                # Always make progress, even if the character is too wide.
+                end = 1
+            line.append(chunk[:end])
+            reversed_chunks[-1] = chunk[end:]
+        elif not line:
+            line.append(reversed_chunks.pop())
@@ -0,0 +1,62 @@
+"""
+Writers
+=======
+
+The base class for output formats besides reStructuredText.
+
+reStructuredText is rendered by the elements themselves (see
+:meth:`pyposo.base.Element.dump`).  Other formats are rendered by a
+`Writer`, which has a ``visit_<ClassName>`` method for the elements it
+supports.  The method for a class is looked up along its MRO once and then
+kept in a dispatch table, so subclasses of supported elements work
+automatically and custom elements only need a new ``visit_`` method.
+"""
+from functools import partial
+
+from .cache import cached_render
+
+
+class Writer:
+    """Base class for writers.
+
+    :cvar name: The name of the format, it's part of the keys of the render
+        cache.  Writers which don't return strings should leave it at
+        ``None``, which disables caching.
+    """
+
+    name = None
+
+    def __init__(self):
+        self._methods = {}
+
+    def _method(self, cls):
+        try:
+            return self._methods[cls]
+        except KeyError:
+            pass
+
+        for klass in cls.__mro__:
+            method = getattr(self, f"visit_{klass.__name__}", None)
+            if method is not None:
+                self._methods[cls] = method
+                return method
+
+        raise TypeError(
+            f"{type(self).__name__} can't render elements of type: "
+            f"{cls.__name__}."
+        )
+
+    def render(self, element):
+        """Render `element` and all of its children.
+
+        :raises TypeError: If the writer has no method for an element.
+        """
+        method = self._method(type(element))
+        if self.name is None:
+            return method(element)
+        return cached_render(element, self.name, partial(method, element))
+
+    def render_children(self, element, child="content"):
+        """Return the rendered elements of the child container `child`."""
+        render = self.render
+        return [render(c) for c in getattr(element, f"_{child}").list]
@@ -1,5 +1,60 @@
-from unittest import TestCase
-from pyposo import Document, Emph, Strong, Paragraph, Title, Section
+import gc
+import http.client
+import importlib.util
+import itertools
+import json
+import os
+import io
+from pathlib import Path
+from shutil import rmtree
+import subprocess
+import sys
+from tempfile import mkdtemp
+from threading import Barrier, Thread
+from unittest import TestCase, mock, skipIf
+import warnings
+import weakref
+from pyposo import (
+    Block,
+    Contents,
+    Reference,
+    Subsection,
+    Subsubsection,
+    Target,
+    UnresolvedReferenceWarning,
+    ListContainer,
+    Document,
+    StreamingDocument,
+    BulletList,
+    ListItem,
+    Emph,
+    Strong,
+    Paragraph,
+    StreamParagraph,
+    LiteralBlock,
+    CodeBlock,
+    Title,
+    Section,
+    EnumeratedList,
+    EnumeratedListItem,
+    FieldList,
+    FieldListItem,
+    write_documents,
+    use_cache,
+    MemoryCache,
+    DiskCache,
+    escape_markup,
+    escape_text,
+    dump_html,
+    applies_to,
+    Str,
+    weak_parents,
+    bulk_build,
+)
+from pyposo.utils import display_width, escape_rst, escape_rst_batch
+from pyposo import containers
+from pyposo.elements import Span, _DivBlock, _Wrapped
+from pyposo.writers import Writer
 
 
 class TestPyposo(TestCase):
@@ -40,3 +95,1314 @@ class TestPyposo(TestCase):
             doc.dump(),
             expected,
         )
+
+
+class TestEnumeratedList(TestCase):
+    def test_alignment(self):
+        items = [EnumeratedListItem(f"Item {i}") for i in range(10)]
+        lines = EnumeratedList(*items).dump().splitlines()
+
+        self.assertEqual(lines[1], "1.  Item 0")
+        self.assertEqual(lines[10], "10. Item 9")
+
+    def test_styles(self):
+        def first_lines(**kwargs):
+            items = (EnumeratedListItem("a"), EnumeratedListItem("b"))
+            return EnumeratedList(*items, **kwargs).dump().split("\n")[1:3]
+
+        self.assertEqual(first_lines(style="#."), ["#. a", "#. b"])
+        self.assertEqual(first_lines(style="a.", start=2), ["b. a", "c. b"])
+        self.assertEqual(first_lines(style="(i)", start=3), ["(iii) a", "(iv)  b"])
+        self.assertEqual(first_lines(style="1)", start=9), ["9)  a", "10) b"])
+
+    def test_invalid_style(self):
+        with self.assertRaises(ValueError):
+            EnumeratedList(style="1-")
+
+    def test_changed_lists(self):
+        items = [EnumeratedListItem(f"i{i}") for i in range(9)]
+        numbers = EnumeratedList(*items)
+        self.assertEqual(items[0].dump_partial(lines=1), "1. i0")
+
+        numbers.append(EnumeratedListItem("i9"))
+        self.assertEqual(items[0].dump_partial(lines=1), "1.  i0")
+        self.assertEqual(items[0].dump(), numbers.dump().split("\n")[1])
+
+        numbers.start = 5
+        self.assertEqual(items[1].dump(), "6.  i1")
+        del numbers.content[0]
+        self.assertEqual(items[1].dump(), "5.  i1")
+        numbers.content[0:2] = numbers.content[1::-1]
+        self.assertEqual(items[1].dump(), "6.  i1")
+
+        letters = EnumeratedList(EnumeratedListItem("x"), style="a)")
+        letters.content.splice(numbers, 0)
+        self.assertEqual(items[1].dump(), "b) i1")
+
+
+class TestBuilder(TestCase):
+    def test_append_later(self):
+        doc = Document()
+        with doc.create(BulletList()):
+            doc.append_later(Paragraph("After"))
+            with doc.create(ListItem()):
+                doc.append(Paragraph("First"))
+                doc.append_later(ListItem("Second"), -1)
+
+        self.assertEqual(doc.dump(), "\n- First\n- Second\n\n\nAfter")
+
+    def test_threads_building_one_document(self):
+        doc = Document()
+        barrier = Barrier(2)
+
+        def build(name):
+            with doc.create(Section(name)):
+                barrier.wait()
+                doc.append(Paragraph(name.lower()))
+                barrier.wait()
+
+        threads = [Thread(target=build, args=(n,)) for n in ("A", "B")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for section in doc.content:
+            title = section.title[0].dump()
+            self.assertEqual(section.content[0].dump(), title.lower())
+
+    def test_extend_concurrently(self):
+        def builder(i):
+            def build():
+                section = Section(str(i))
+                with section.create(BulletList()):
+                    section.append(ListItem(str(i)))
+                return section
+
+            return build
+
+        doc = Document()
+        doc.extend_concurrently(*map(builder, range(20)), max_workers=4)
+
+        titles = [section.title[0].dump() for section in doc.content]
+        self.assertEqual(titles, [str(i) for i in range(20)])
+
+    def test_extend_concurrently_settings(self):
+        def build():
+            paragraph = Paragraph("a_b")
+            with paragraph.create(Emph()):
+                paragraph.append(Span("c_d"))
+            return paragraph
+
+        doc = Document()
+        with escape_markup(), doc.create(Section("Outer")):
+            children = doc.extend_concurrently(build, build, max_workers=2)
+
+        for paragraph in children:
+            self.assertEqual(paragraph.dump().strip(), "a\\_b*c\\_d*")
+        self.assertEqual(list(doc.content[0].content), children)
+
+
+class TestSplice(TestCase):
+    def test_splice_documents(self):
+        first = Document(Section("A", Paragraph("a")))
+        second = Document(Paragraph("b"), Paragraph("c"))
+        master = Document(Paragraph("start"))
+
+        master.splice(second)
+        master.splice(first, 1)
+
+        self.assertEqual(len(first.content), 0)
+        self.assertEqual(len(second.content), 0)
+        self.assertEqual(
+            [type(c).__name__ for c in master.content],
+            ["Paragraph", "Section", "Paragraph", "Paragraph"],
+        )
+        self.assertIs(master.content[1].parent, master)
+
+    def test_splice_checks_narrower_container(self):
+        paragraph = Paragraph("p")
+        with self.assertRaises(TypeError):
+            paragraph.content.splice(Document(Paragraph("q")))
+
+
+class TestSliceView(TestCase):
+    def setUp(self):
+        self.doc = Document(*(Paragraph(str(i)) for i in range(10)))
+
+    def test_view_shares_elements(self):
+        view = self.doc.content[2:8:2]
+
+        self.assertEqual(len(view), 3)
+        self.assertIs(view[1], self.doc.content[4])
+        self.assertIs(view.parent, self.doc)
+        self.assertEqual(list(view[1:]), list(self.doc.content[4:8:2]))
+
+    def test_mutation_copies(self):
+        view = self.doc.content[:3]
+        del view[0]
+
+        self.assertEqual(len(view), 2)
+        self.assertEqual(len(self.doc.content), 10)
+        with self.assertRaises(TypeError):
+            view.append(Emph("Not a block"))
+
+    def test_source_changes(self):
+        view = self.doc.content[1:4]
+        nested = view[1:]
+        del self.doc.content[0:3]
+        self.assertEqual(len(view), 3)
+        self.assertEqual(list(view), list(self.doc.content[1:4]))
+        self.assertIs(view[2], self.doc.content[3])
+        self.assertEqual(list(nested), list(self.doc.content[2:4]))
+
+        del self.doc.content[2:]
+        self.assertEqual(len(view), 1)
+        self.assertEqual(list(view), [self.doc.content[1]])
+        with self.assertRaises(IndexError):
+            view[1]
+        self.assertEqual(len(nested), 0)
+
+    def test_copy_is_detached(self):
+        view = self.doc.content[:3]
+        paragraph = Paragraph("New")
+        view.append(paragraph)
+        self.assertIsNone(view.parent)
+        self.assertIsNone(paragraph.parent)
+        self.assertIs(view[0].parent, self.doc)
+        self.assertEqual(len(self.doc.content), 10)
+
+    def test_assignment_is_detached(self):
+        for mutate in [
+            lambda view, p: view.__setitem__(0, p),
+            lambda view, p: view.__setitem__(slice(0, 1), [p]),
+            lambda view, p: view.insert(0, p),
+            lambda view, p: view.splice(Document(p)),
+        ]:
+            view = self.doc.content[:3]
+            paragraph = Paragraph("New")
+            mutate(view, paragraph)
+            self.assertIn(paragraph, list(view))
+            self.assertIsNone(paragraph.parent)
+            self.assertIsNone(paragraph.location)
+            self.assertNotIn(paragraph, list(self.doc.content))
+
+
+class TestAttach(TestCase):
+    def test_parent_set_on_insert(self):
+        paragraph = Paragraph("p")
+        doc = Document()
+        doc.append(paragraph)
+
+        self.assertIs(paragraph.parent, doc)
+        self.assertEqual(paragraph.location, "content")
+
+    def test_reads_are_pure(self):
+        doc = Document(Paragraph("p"))
+        paragraph = doc.content[0]
+        paragraph.parent = None
+
+        self.assertIs(doc.content[0], paragraph)
+        self.assertEqual(list(doc.content), [paragraph])
+        self.assertIsNone(paragraph.parent)
+
+    def test_primitive_values(self):
+        container = ListContainer(1, "a", True)
+        self.assertEqual(list(container), [1, "a", True])
+
+
+class TestWriteDocuments(TestCase):
+    def setUp(self):
+        self.directory = Path(mkdtemp())
+        self.manifest = self.directory / "manifest.json"
+        self.addCleanup(rmtree, self.directory)
+
+    def write(self, **documents):
+        return write_documents(documents, self.manifest, self.directory)
+
+    def test_incremental(self):
+        report = self.write(a=Document(Paragraph("a")), b=Document())
+        self.assertEqual(len(report.written), 2)
+        self.assertEqual((self.directory / "a").read_text(), "a")
+
+        report = self.write(a=Document(Paragraph("a")), b=Document())
+        self.assertEqual(len(report.skipped), 2)
+
+        report = self.write(a=Document(Paragraph("changed")))
+        self.assertEqual(report.written, [self.directory / "a"])
+
+    def test_unchanged_output_not_rewritten(self):
+        (self.directory / "a").write_text("a")
+        report = self.write(a=Document(Paragraph("a")))
+        self.assertEqual(report.unchanged, [self.directory / "a"])
+
+    @skipIf(os.name == "nt", "needs POSIX file modes")
+    def test_file_modes(self):
+        plain = self.directory / "plain"
+        plain.write_text("")
+        self.write(a=Document(Paragraph("a")))
+        mode = (self.directory / "a").stat().st_mode
+        self.assertEqual(mode, plain.stat().st_mode)
+        self.assertEqual(self.manifest.stat().st_mode, mode)
+
+        (self.directory / "a").chmod(0o640)
+        self.write(a=Document(Paragraph("changed")))
+        self.assertEqual((self.directory / "a").stat().st_mode & 0o777, 0o640)
+
+    def test_modified_file_is_rewritten(self):
+        self.write(a=Document(Paragraph("a")))
+        (self.directory / "a").write_text("edited by hand")
+
+        report = self.write(a=Document(Paragraph("a")))
+        self.assertEqual(len(report.written), 1)
+        self.assertEqual((self.directory / "a").read_text(), "a")
+
+
+class TestRenderCache(TestCase):
+    @staticmethod
+    def document(width=None):
+        items = [EnumeratedListItem("Item"), EnumeratedListItem("Item")]
+        return Document(
+            Section("Notes", Paragraph("Same"), EnumeratedList(*items)),
+            Section("More", Paragraph("Same"), EnumeratedList(*items[::-1])),
+            textwidth=width,
+        )
+
+    def test_same_output(self):
+        expected = self.document().dump()
+        cache = MemoryCache()
+        with use_cache(cache):
+            self.assertEqual(self.document().dump(), expected)
+            self.assertEqual(self.document().dump(), expected)
+
+    def test_context_is_part_of_key(self):
+        expected = self.document(width=5).dump()
+        with use_cache(MemoryCache()):
+            self.document().dump()
+            self.assertEqual(self.document(width=5).dump(), expected)
+
+    def test_leader_is_part_of_key(self):
+        def document():
+            text = "Some words which are wrapped after the leader of the field."
+            return Document(
+                FieldList(
+                    FieldListItem("short term", Paragraph(text)),
+                    FieldListItem("a much much longer term", Paragraph(text)),
+                ),
+                textwidth=40,
+            )
+
+        expected = document().dump()
+        with use_cache(MemoryCache()):
+            self.assertEqual(document().dump(), expected)
+
+    def test_eviction(self):
+        cache = MemoryCache(max_size=10)
+        cache.set("a", "12345")
+        cache.set("b", "12345")
+        cache.get("a")
+        cache.set("c", "1")
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "12345")
+        self.assertEqual(cache.size, 6)
+
+    def test_disk_cache(self):
+        directory = mkdtemp()
+        self.addCleanup(rmtree, directory)
+
+        with use_cache(DiskCache(directory)):
+            first = self.document().dump()
+        with use_cache(DiskCache(directory)):
+            self.assertEqual(self.document().dump(), first)
+
+
+class TestEscaping(TestCase):
+    def test_escape_rst(self):
+        self.assertEqual(
+            escape_rst(r"*a* `b` |c| d_ \\"), r"\*a\* \`b\` \|c\| d\_ \\\\"
+        )
+        self.assertEqual(escape_rst_batch(["a_b", "\0*"]), ["a\\_b", "\0\\*"])
+
+    def test_escape_markup(self):
+        with escape_markup():
+            paragraph = Paragraph("*not emphasized*")
+        self.assertEqual(paragraph.dump(), r"\*not emphasized\*")
+        self.assertEqual(Paragraph("*emphasized*").dump(), "*emphasized*")
+
+    def test_escape_text_once(self):
+        doc = Document(Paragraph("a_b", Emph("c*")))
+        with escape_markup():
+            doc.append(Paragraph("d_e"))
+
+        escape_text(escape_text(doc))
+        self.assertEqual(doc.dump(), "a\\_b*c\\**\n\nd\\_e")
+
+
+class TestHTML(TestCase):
+    def test_inline(self):
+        paragraph = Paragraph("a <b>", Emph("c"), Strong("d"))
+        self.assertEqual(
+            dump_html(paragraph),
+            "<p>a &lt;b&gt;<em>c</em><strong>d</strong></p>",
+        )
+
+    def test_section_and_lists(self):
+        doc = Document(
+            Section(
+                "A Section",
+                BulletList(ListItem("x")),
+                EnumeratedList(EnumeratedListItem("y"), start=3, style="i."),
+            )
+        )
+        self.assertEqual(
+            dump_html(doc),
+            '<section id="a-section">\n<h2>A Section</h2>\n'
+            "<ul>\n<li>x</li>\n</ul>\n"
+            '<ol type="i" start="3">\n<li>y</li>\n</ol>\n</section>',
+        )
+
+    def test_escaped_text(self):
+        with escape_markup():
+            paragraph = Paragraph("a_b")
+        self.assertEqual(dump_html(paragraph), "<p>a_b</p>")
+
+    def test_unsupported_element(self):
+        class ParagraphWriter(Writer):
+            def visit_Paragraph(self, paragraph):
+                return "".join(self.render_children(paragraph))
+
+        with self.assertRaisesRegex(TypeError, "ParagraphWriter.*Span"):
+            ParagraphWriter().render(Paragraph("a"))
+
+
+@skipIf(importlib.util.find_spec("docutils") is None, "needs docutils")
+class TestDoctree(TestCase):
+    def test_same_tree_as_parsing(self):
+        from docutils.core import publish_doctree
+        from pyposo.doctree import to_document
+
+        doc = Document(
+            Section(
+                "A Section",
+                Paragraph("Some words"),
+                BulletList(ListItem("x"), ListItem("y")),
+                EnumeratedList(EnumeratedListItem("z"), style="(a)"),
+            )
+        )
+        parsed = publish_doctree(
+            doc.dump(), settings_overrides={"doctitle_xform": False}
+        )
+
+        self.assertEqual(to_document(doc)[0].pformat(), parsed[0].pformat())
+
+    def test_inline(self):
+        from pyposo.doctree import to_nodes
+
+        (paragraph,) = to_nodes(Paragraph("a ", Emph("b"), Strong("c")))
+        self.assertEqual(
+            [child.tagname for child in paragraph.children],
+            ["#text", "emphasis", "strong"],
+        )
+
+
+class TestDocumentIndex(TestCase):
+    def setUp(self):
+        self.doc = Document(
+            Section("Intro", Paragraph("x"), label="intro"),
+            Section("Usage Notes", BulletList(ListItem("y"))),
+            index=True,
+        )
+        self.index = self.doc.element_index
+        self.addCleanup(self.doc.disable_index)
+
+    def test_lookups(self):
+        intro, usage = self.doc.content
+        self.assertEqual(self.index.sections("Intro"), [intro])
+        self.assertEqual(self.index.sections_by_slug("usage-notes"), [usage])
+        self.assertIs(self.index.label("intro"), intro)
+        self.assertEqual(len(self.index.of_type(Block)), 3)
+
+    def test_updates(self):
+        del self.doc.content[0]
+        self.doc.append(Section("New", Paragraph("z")))
+        self.doc.content[0].title.append(Emph("!"))
+        self.doc.content[1].label = "new"
+
+        self.assertEqual(self.index.sections("Intro"), [])
+        self.assertEqual(self.index.sections("Usage Notes!"), [self.doc.content[0]])
+        self.assertIs(self.index.label("new"), self.doc.content[1])
+        self.assertEqual(len(self.index.of_type(Paragraph)), 1)
+        with self.assertRaises(KeyError):
+            self.index.label("intro")
+
+    def test_label_rendering(self):
+        self.assertTrue(self.doc.dump().startswith(".. _intro:\n\nIntro\n"))
+
+    def test_freed_documents(self):
+        active = containers._active_indexes
+        doc = Document(Section("Gone"), index=True)
+        self.assertEqual(containers._active_indexes, active + 1)
+        del doc
+        gc.collect()
+        self.assertEqual(containers._active_indexes, active)
+
+        doc = Document(index=True)
+        doc.disable_index()
+        doc.enable_index()
+        doc.disable_index()
+        del doc
+        gc.collect()
+        self.assertEqual(containers._active_indexes, active)
+
+
+class TestReferences(TestCase):
+    def document(self):
+        return Document(
+            Contents(),
+            Section("Intro", Paragraph(Reference("usage"), Target("spot"))),
+            Subsection("Details", Contents(title="Here")),
+            Subsubsection("Deep"),
+            Section("Usage", Paragraph(Reference("Intro", "back")), label="usage"),
+        )
+
+    def test_contents(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            text = self.document().dump()
+
+        self.assertTrue(
+            text.startswith(
+                "- `Intro`_\n\n  - `Details`_\n\n    - `Deep`_\n\n\n"
+                "- `Usage <usage_>`_\n"
+            )
+        )
+        self.assertIn("Details\n-------\n**Here**\n\n- `Deep`_\n", text)
+        self.assertIn("`usage`_", text)
+        self.assertIn("`back <Intro_>`_", text)
+
+    def test_unresolved(self):
+        doc = Document(Paragraph(Reference("missing"), Reference("spot")))
+        doc.append(Paragraph(Target("spot")))
+
+        with self.assertWarnsRegex(UnresolvedReferenceWarning, "missing") as cm:
+            doc.dump()
+        self.assertEqual(cm.filename, __file__)
+
+        with use_cache(MemoryCache()), self.assertWarns(
+            UnresolvedReferenceWarning
+        ) as cm:
+            doc.dump()
+        self.assertEqual(cm.filename, __file__)
+
+    def test_contents_with_cache(self):
+        expected = self.document().dump()
+        with use_cache(MemoryCache()):
+            self.document().dump()
+            self.assertEqual(self.document().dump(), expected)
+
+    def test_role(self):
+        self.assertEqual(
+            Reference("label", "text", role="ref").dump(), ":ref:`text <label>`"
+        )
+
+
+class TestSpecs(TestCase):
+    def test_from_spec(self):
+        from pyposo.spec import from_spec
+
+        doc = from_spec(
+            {
+                "textwidth": 40,
+                "content": [
+                    {
+                        "type": "Section",
+                        "title": "Intro",
+                        "label": "intro",
+                        "content": [
+                            "Some text.",
+                            {
+                                "type": "EnumeratedList",
+                                "start": 3,
+                                "items": [
+                                    {
+                                        "type": "EnumeratedListItem",
+                                        "content": ["An item."],
+                                    }
+                                ],
+                            },
+                        ],
+                    }
+                ],
+            }
+        )
+        expected = Document(
+            Section(
+                "Intro",
+                Paragraph("Some text."),
+                EnumeratedList(
+                    EnumeratedListItem(Paragraph("An item.")), start=3
+                ),
+                label="intro",
+            ),
+            textwidth=40,
+        )
+        self.assertEqual(doc.dump(), expected.dump())
+
+    def test_errors(self):
+        from pyposo.spec import from_spec
+
+        with self.assertRaisesRegex(ValueError, "Unknown element type"):
+            from_spec({"type": "Nope"})
+        with self.assertRaisesRegex(ValueError, "needs the argument: title"):
+            from_spec({"type": "Section"})
+        with self.assertRaisesRegex(ValueError, "Unknown arguments"):
+            from_spec({"type": "Paragraph", "colour": "red"})
+        with self.assertRaisesRegex(ValueError, "Document: textwdith"):
+            from_spec({"type": "Document", "textwdith": 20, "content": ["x"]})
+
+    def test_keyword_arguments(self):
+        from pyposo.spec import from_spec
+
+        class Box(Paragraph):
+            """A paragraph with options.
+
+            :param width: How wide the box is.
+            """
+
+            __slots__ = ["options"]
+
+            def __init__(self, *args, **options):
+                super().__init__(*args)
+                self.options = options
+
+        box = from_spec({"type": "Box", "width": 3}, {"Box": Box})
+        self.assertEqual(box.options, {"width": 3})
+        with self.assertRaisesRegex(ValueError, "Box: height"):
+            from_spec({"type": "Box", "height": 3}, {"Box": Box})
+
+    def test_command_line(self):
+        from pyposo.__main__ import main
+
+        directory = Path(mkdtemp())
+        self.addCleanup(rmtree, directory)
+        specs = []
+        for i in range(3):
+            specs.append(directory / f"doc{i}.json")
+            specs[-1].write_text(f'{{"content": ["Document {i}"]}}')
+
+        for jobs in ["1", "2"]:
+            args = [*map(str, specs), "-q", "-j", jobs]
+            args += ["--manifest", str(directory / f"manifest{jobs}")]
+            args += ["-o", str(directory / f"out{jobs}")]
+            self.assertEqual(main(args), 0)
+            self.assertEqual(
+                (directory / f"out{jobs}" / "doc2.rst").read_text(),
+                "Document 2",
+            )
+
+            mtime = (directory / f"out{jobs}" / "doc0.rst").stat().st_mtime_ns
+            self.assertEqual(main(args), 0)
+            self.assertEqual(
+                (directory / f"out{jobs}" / "doc0.rst").stat().st_mtime_ns,
+                mtime,
+            )
+
+    def test_command_line_file_changes(self):
+        from pyposo.__main__ import main
+
+        directory = Path(mkdtemp())
+        self.addCleanup(rmtree, directory)
+        data = directory / "data.txt"
+        data.write_text("old")
+        spec = directory / "doc.json"
+        spec.write_text(
+            json.dumps({"content": [{"type": "LiteralBlock", "path": str(data)}]})
+        )
+
+        args = [str(spec), "-q", "-j", "1", "-o", str(directory)]
+        args += ["--manifest", str(directory / "manifest")]
+        self.assertEqual(main(args), 0)
+        self.assertEqual((directory / "doc.rst").read_text(), "::\n\n   old")
+
+        data.write_text("changed")
+        self.assertEqual(main(args), 0)
+        self.assertEqual(
+            (directory / "doc.rst").read_text(), "::\n\n   changed"
+        )
+
+
+class TestStats(TestCase):
+    def test_stats(self):
+        doc = Document(
+            Section(
+                "Title",
+                BulletList(*[ListItem(Paragraph("item")) for _ in range(5)]),
+                Paragraph("ä"),
+            )
+        )
+        stats = doc.stats(largest=2)
+
+        self.assertEqual(stats.counts["ListItem"], 5)
+        self.assertEqual(stats.nodes, sum(1 for _ in doc.walk()))
+        # Document, Section, BulletList, ListItem, Paragraph, Span, Str
+        self.assertEqual(stats.max_depth, 6)
+        self.assertEqual(
+            [(length, name) for length, _, name in stats.largest_containers],
+            [(5, "content"), (2, "content")],
+        )
+        self.assertIs(stats.largest_containers[0][1], doc.content[0].content[0])
+        self.assertEqual(stats.text_bytes, len("Title") + 5 * len("item") + 2)
+        self.assertGreater(stats.memory, stats.text_bytes)
+        self.assertEqual(
+            stats.as_dict()["largest_containers"][0][1], "BulletList.content"
+        )
+
+    def test_deep_tree(self):
+        item = ListItem(Paragraph("deep"))
+        for _ in range(5000):
+            item = ListItem(BulletList(item))
+        # ListItem, BulletList, ... ListItem, Paragraph, Span, Str
+        self.assertEqual(item.stats().max_depth, 10003)
+
+
+class TestFrozen(TestCase):
+    def document(self):
+        return Document(
+            Section(
+                "A",
+                Paragraph("one"),
+                BulletList(ListItem(Paragraph("x")), ListItem(Paragraph("y"))),
+            ),
+            Section("B", Paragraph("two")),
+            textwidth=30,
+        )
+
+    def test_structural_sharing(self):
+        frozen = self.document().freeze()
+        edited = frozen.replace((0, 1, 1, 0), Paragraph("changed"))
+
+        self.assertEqual(frozen.dump(), self.document().dump())
+        self.assertIn("- changed", edited.dump())
+        self.assertIs(edited.get((1,)), frozen.get((1,)))
+        self.assertIs(edited.get((0, 1, 0)), frozen.get((0, 1, 0)))
+        self.assertIsNot(edited.get((0, 1)), frozen.get((0, 1)))
+        self.assertEqual(
+            [e.cls for e in edited.ancestors((0, 1))],
+            [Document, Section, BulletList],
+        )
+
+    def test_insert_and_delete(self):
+        frozen = self.document().freeze()
+        edited = frozen.insert((1,), Section("New", Paragraph("n")))
+        edited = edited.delete((0,))
+
+        expected = Document(
+            Section("New", Paragraph("n")),
+            Section("B", Paragraph("two")),
+            textwidth=30,
+        )
+        self.assertEqual(edited.dump(), expected.dump())
+        self.assertEqual(edited.thaw().fingerprint(), expected.fingerprint())
+
+    def test_immutable(self):
+        frozen = self.document().freeze()
+        with self.assertRaises(AttributeError):
+            frozen.cls = Section
+        with self.assertRaises(TypeError):
+            frozen.replace((0, 0), Section("Not a block"))
+        with self.assertRaises(IndexError):
+            frozen.delete((5,))
+
+    def test_render_in_threads(self):
+        frozen = self.document().freeze()
+        expected = frozen.dump()
+        results = []
+        threads = [
+            Thread(target=lambda: results.append(frozen.dump()))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [expected] * 4)
+
+
+class TestNestedRendering(TestCase):
+    def test_nested_lists_are_wrapped_once(self):
+        text = "word " * 12
+        doc = Document(
+            BulletList(
+                ListItem(
+                    Paragraph(text),
+                    EnumeratedList(
+                        EnumeratedListItem(Paragraph(text)),
+                        EnumeratedListItem(
+                            Paragraph(text), BulletList(ListItem(text))
+                        ),
+                    ),
+                )
+            ),
+            textwidth=24,
+        )
+        lines = doc.dump().splitlines()
+
+        self.assertEqual(lines[1], "- word word word word")
+        self.assertIn("  1. word word word word", lines)
+        self.assertIn("     word word word word", lines)
+        self.assertIn("     - word word word", lines)
+        self.assertIn("       word word word", lines)
+        self.assertTrue(all(len(line) <= 24 for line in lines))
+
+    def test_long_field_name(self):
+        doc = Document(
+            FieldList(FieldListItem("a long name", Paragraph("word " * 6))),
+            textwidth=20,
+        )
+        self.assertEqual(
+            doc.dump(),
+            "\n:a long name: word\n   word word word\n   word word\n",
+        )
+
+    def test_directive(self):
+        doc = Document(
+            BulletList(
+                ListItem(
+                    Paragraph("Item"),
+                    _DivBlock("note", Paragraph("word " * 6)),
+                )
+            ),
+            textwidth=20,
+        )
+        self.assertEqual(
+            doc.dump(),
+            "\n- Item\n\n  .. class:: note\n\n     word word word\n"
+            "     word word word\n",
+        )
+
+
+@skipIf(importlib.util.find_spec("docutils") is None, "needs docutils")
+class TestNestedRoundTrip(TestCase):
+    def list_(self, kind, term, *content):
+        # The item with `content` comes second, after an item without an
+        # empty line.
+        if kind is FieldList:
+            return FieldList(
+                FieldListItem("b", "x"), FieldListItem(term, *content)
+            )
+        item = ListItem if kind is BulletList else EnumeratedListItem
+        return kind(item("x"), item(*content))
+
+    def test_docutils_parses_nested_lists(self):
+        from docutils.core import publish_doctree
+
+        kinds = [BulletList, EnumeratedList, FieldList]
+        for outer, middle, inner in itertools.product(kinds, repeat=3):
+            for term in ["a", "a long field name"]:
+                for first_paragraph in [False, True]:
+                    blocks = [self.list_(inner, term, Paragraph("word " * 9))]
+                    if first_paragraph:
+                        blocks.insert(0, Paragraph("word " * 9))
+                    nested = self.list_(middle, term, *blocks)
+                    doc = Document(
+                        Paragraph("Start."),
+                        self.list_(outer, term, nested, Paragraph("end")),
+                        Paragraph("End."),
+                        textwidth=30,
+                    )
+                    text = doc.dump()
+                    warnings_ = io.StringIO()
+                    publish_doctree(
+                        text,
+                        settings_overrides={
+                            "warning_stream": warnings_,
+                            "report_level": 1,
+                        },
+                    )
+                    with self.subTest(text=text):
+                        self.assertEqual(warnings_.getvalue(), "")
+                        self.assertEqual("".join(doc.iter_dump()), text)
+
+
+class TestPartialRendering(TestCase):
+    def document(self):
+        return Document(
+            Contents(),
+            *(
+                Section(
+                    f"Section {i}",
+                    Paragraph("text " * 20),
+                    EnumeratedList(
+                        *(EnumeratedListItem(Paragraph("item")) for _ in range(3))
+                    ),
+                )
+                for i in range(20)
+            ),
+            textwidth=40,
+        )
+
+    def test_iter_dump(self):
+        doc = self.document()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UnresolvedReferenceWarning)
+            self.assertEqual("".join(doc.iter_dump()), doc.dump())
+
+    def test_lines_and_chars(self):
+        doc = self.document()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UnresolvedReferenceWarning)
+            full = doc.dump()
+
+        self.assertEqual(
+            doc.dump_partial(lines=30), "\n".join(full.split("\n")[:30])
+        )
+        self.assertEqual(doc.dump_partial(chars=100), full[:100])
+        self.assertEqual(doc.dump_partial(lines=10**6), full)
+
+    def test_element_in_context(self):
+        doc = self.document()
+        section = doc.content[5]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UnresolvedReferenceWarning)
+            full = doc.dump()
+
+        text = section.dump_partial(lines=4)
+        self.assertTrue(text.startswith("\nSection 4\n========="))
+        self.assertIn(text, full)
+        self.assertEqual(
+            doc.content[1].content[1].content[2].dump_partial(),
+            "3. item",
+        )
+
+
+class TestStreamParagraph(TestCase):
+    text = "Some words, a " + "y" * 50 + " and  more\nwords " * 30
+
+    def test_same_as_paragraph(self):
+        for buffer_size in [1, 7, 2 ** 16]:
+            with self.subTest(buffer_size=buffer_size), mock.patch.object(
+                StreamParagraph, "_buffer_size", buffer_size
+            ):
+                text = self.text
+                chunks = [text[i : i + 5] for i in range(0, len(text), 5)]
+                doc = Document(
+                    Paragraph("First."),
+                    BulletList(ListItem(StreamParagraph(chunks))),
+                    textwidth=40,
+                )
+                expected = Document(
+                    Paragraph("First."),
+                    BulletList(ListItem(Paragraph(self.text))),
+                    textwidth=40,
+                )
+                self.assertEqual(doc.dump(), expected.dump())
+
+    def test_sources(self):
+        file_ = io.StringIO("skipped " + self.text)
+        file_.seek(len("skipped "))
+        paragraph = StreamParagraph(file_)
+        self.assertEqual(paragraph.dump(), Paragraph(self.text).dump())
+        self.assertEqual(paragraph.dump(), Paragraph(self.text).dump())
+
+        paragraph = StreamParagraph(iter([self.text]))
+        paragraph.dump()
+        with self.assertRaises(RuntimeError):
+            paragraph.dump()
+
+        self.assertEqual(StreamParagraph(["*a*"], escape=True).dump(), r"\*a\*")
+
+    def test_lazy(self):
+        read = []
+
+        def chunks():
+            for i in range(10 ** 6):
+                read.append(i)
+                yield "word " * 1000
+
+        doc = Document(StreamParagraph(chunks()), textwidth=79)
+        self.assertEqual(len(doc.dump_partial(lines=10).splitlines()), 10)
+        self.assertLess(len(read), 100)
+
+
+class TestFileBlocks(TestCase):
+    def setUp(self):
+        directory = Path(mkdtemp())
+        self.addCleanup(rmtree, directory)
+        self.path = directory / "data.py"
+        self.path.write_text("def f():\n\n    return 1\n")
+        self.empty = directory / "empty"
+        self.empty.write_text("")
+
+    def test_dump(self):
+        doc = Document(Paragraph("Code:"), LiteralBlock(self.path))
+        self.assertEqual(
+            doc.dump(), "Code:\n\n::\n\n   def f():\n\n       return 1"
+        )
+
+        block = CodeBlock(self.path, "python", start=10)
+        self.assertEqual(block.dump(), ".. code-block:: python\n\n       return 1")
+        block = CodeBlock(self.path, stop=8)
+        self.assertEqual(block.dump(), ".. code-block::\n\n   def f():")
+        self.assertEqual(LiteralBlock(self.empty).dump(), "::")
+
+    def test_nested(self):
+        doc = Document(BulletList(ListItem(LiteralBlock(self.path, stop=9))))
+        self.assertEqual(doc.dump(), "\n- ::\n\n     def f():\n")
+
+    def test_batches(self):
+        self.path.write_text("".join(f"line {i}\n" for i in range(1000)))
+        expected = Document(
+            Paragraph("a"), LiteralBlock(self.path), Paragraph("b")
+        ).dump()
+        with mock.patch("pyposo.elements._FILE_BATCH_SIZE", 10):
+            block = LiteralBlock(self.path)
+            doc = Document(Paragraph("a"), block, Paragraph("b"))
+            self.assertEqual(doc.dump(), expected)
+            self.assertEqual("".join(doc.iter_dump()), expected)
+            self.assertGreater(len(list(block._iter_content())), 100)
+            self.assertEqual(doc.dump_partial(lines=5).splitlines()[-1], "   line 0")
+
+    def test_changed_file(self):
+        block = LiteralBlock(self.path)
+        first = block.dump()
+        self.path.write_text("changed\n")
+        self.assertNotEqual(block.dump(), first)
+
+    def test_html(self):
+        self.assertEqual(
+            dump_html(CodeBlock(self.path, "python", stop=8)),
+            '<pre class="code python literal-block">def f():</pre>',
+        )
+
+
+class TestStreamingDocument(TestCase):
+    def build(self, document):
+        document.append(Paragraph("Intro."))
+        for i in range(3):
+            with document.create(Section(f"Section {i}", label=f"s{i}")):
+                document.append(Paragraph(f"Text {i} with a ref:"))
+                document.append(Paragraph(Reference(f"s{2 - i}")))
+                with document.create(BulletList()):
+                    document.append(ListItem(Paragraph("Deeper.")))
+                document.append_later(Paragraph(f"After {i}."))
+        document.append(Paragraph("The end."))
+
+    def test_same_as_document(self):
+        expected = Document(textwidth=40)
+        self.build(expected)
+
+        file_ = io.StringIO()
+        with StreamingDocument(file_, textwidth=40) as document:
+            self.build(document)
+        self.assertEqual(file_.getvalue(), expected.dump())
+
+    def test_sections_are_released(self):
+        file_ = io.StringIO()
+        document = StreamingDocument(file_, Paragraph("Intro."))
+        with document.create(Section("First")):
+            document.append(Paragraph("Text."))
+            self.assertEqual(file_.getvalue(), "")
+        self.assertEqual(len(document.content), 1)
+        self.assertIn("First", file_.getvalue())
+
+        with document.create(Section("Second")):
+            with document.create(BulletList()):
+                document.append(ListItem(Paragraph("Nested")))
+            self.assertNotIn("Nested", file_.getvalue())
+        self.assertEqual(len(document.content), 1)
+
+        document.append(Paragraph("Rest."))
+        self.assertNotIn("Rest.", file_.getvalue())
+        document.close()
+        self.assertTrue(file_.getvalue().endswith("Rest."))
+        with self.assertRaises(ValueError):
+            document.flush()
+
+    def test_path_and_unresolved_references(self):
+        directory = Path(mkdtemp())
+        self.addCleanup(rmtree, directory)
+        path = directory / "out.rst"
+        with self.assertWarns(UnresolvedReferenceWarning) as cm:
+            with StreamingDocument(path) as document:
+                with document.create(Section("Only")):
+                    document.append(Paragraph(Reference("missing")))
+        self.assertEqual(cm.filename, __file__)
+        self.assertTrue(path.read_text().startswith("Only"))
+
+    def test_written_in_pieces(self):
+        directory = Path(mkdtemp())
+        self.addCleanup(rmtree, directory)
+        path = directory / "data.txt"
+        path.write_text("".join(f"line {i}\n" for i in range(1000)))
+
+        writes = []
+        file_ = io.StringIO()
+        file_.write = writes.append
+        with mock.patch("pyposo.elements._FILE_BATCH_SIZE", 100):
+            with StreamingDocument(file_) as document:
+                with document.create(Section("Data")):
+                    document.append(LiteralBlock(path))
+        self.assertGreater(len(writes), 50)
+        self.assertLess(max(map(len, writes)), 200)
+        expected = Document(Section("Data", LiteralBlock(path))).dump()
+        self.assertEqual("".join(writes), expected)
+
+    def test_contents(self):
+        document = StreamingDocument(io.StringIO(), Contents())
+        with self.assertRaises(ValueError):
+            document.close()
+
+
+class TestTransform(TestCase):
+    def document(self):
+        return Document(
+            Section("Intro", Paragraph("Some ", Emph("emphasized"), " text.")),
+            Subsection("Details", Paragraph(Strong("strong"), " words")),
+        )
+
+    def test_filters(self):
+        calls = []
+
+        @applies_to(Emph)
+        def strip_emph(emph):
+            return list(emph.content)
+
+        @applies_to(Subsection)
+        def promote(subsection):
+            return Section(list(subsection.title), *subsection.content)
+
+        @applies_to(Str)
+        def upper(str_):
+            calls.append(str_.string)
+            return Str(str_.string.upper())
+
+        def count(element):
+            calls.append(type(element))
+
+        doc = self.document()
+        doc.transform(strip_emph, promote, upper, count)
+        expected = Document(
+            Section("INTRO", Paragraph("SOME", "EMPHASIZED", "TEXT.")),
+            Section("DETAILS", Paragraph(Strong("STRONG"), "WORDS")),
+        )
+        self.assertEqual(doc.dump(), expected.dump())
+        # Every element is visited once.
+        self.assertEqual(calls.count("emphasized"), 1)
+        self.assertEqual(calls.count(Section), 2)
+        self.assertNotIn(Subsection, calls)
+
+    def test_delete(self):
+        doc = self.document()
+        doc.transform(applies_to(_Wrapped)(lambda e: []))
+        self.assertNotIn("*", doc.dump())
+        self.assertEqual(len(doc.content[1].content[0].content), 1)
+
+        doc.transform(applies_to(Section)(lambda e: []))
+        self.assertEqual(len(doc.content), 1)
+
+    def test_type_check(self):
+        doc = self.document()
+        with self.assertRaises(TypeError):
+            doc.transform(applies_to(Emph)(lambda e: Paragraph("x")))
+
+    def test_deep_tree(self):
+        item = ListItem(Paragraph("deep"))
+        for _ in range(5000):
+            item = ListItem(BulletList(item))
+        doc = Document(BulletList(item))
+        doc.transform(applies_to(Str)(lambda s: Str("x")))
+        strings = [e.string for e in doc.walk() if isinstance(e, Str)]
+        self.assertEqual(strings, ["x"])
+
+
+class TestGarbage(TestCase):
+    def build(self):
+        return Document(
+            Section("Title", Paragraph("Some", Emph("text"))),
+            BulletList(ListItem(Paragraph("item"))),
+            textwidth=40,
+        )
+
+    def test_weak_parents(self):
+        expected = self.build().dump()
+        with weak_parents():
+            doc = self.build()
+        paragraph = doc.content[0].content[0]
+        self.assertIs(paragraph.parent, doc.content[0])
+        self.assertIs(paragraph.document, doc)
+        self.assertEqual(doc.dump(), expected)
+        self.assertEqual(doc.freeze().thaw().dump(), expected)
+
+        enabled = gc.isenabled()
+        gc.disable()
+        self.addCleanup(lambda: gc.enable() if enabled else None)
+        gc.collect()
+        root = weakref.ref(doc)
+        del doc
+        self.assertIsNone(root())
+        self.assertIsNone(paragraph.parent)
+
+    def test_plain_parent_slot_until_used(self):
+        code = (
+            "from pyposo import Element, ListContainer, weak_parents\n"
+            "kinds = lambda: [type(vars(c)['parent']).__name__"
+            " for c in (Element, ListContainer)]\n"
+            "print(kinds())\n"
+            "with weak_parents(False): print(kinds())\n"
+            "with weak_parents(): print(kinds())\n"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=Path(__file__).parent.parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.splitlines()
+        slots = str(["member_descriptor"] * 2)
+        self.assertEqual(output, [slots, slots, str(["property"] * 2)])
+
+    def test_strong_parents(self):
+        with weak_parents(), weak_parents(False):
+            doc = self.build()
+        self.assertIs(type(doc.content._parent), Document)
+
+    def test_bulk_build(self):
+        enabled = gc.isenabled()
+        with bulk_build():
+            self.assertFalse(gc.isenabled())
+            with bulk_build():
+                pass
+            self.assertFalse(gc.isenabled())
+            self.build()
+        self.assertEqual(gc.isenabled(), enabled)
+
+
+class TestServer(TestCase):
+    spec = {"type": "Document", "content": [
+        {"type": "Section", "title": "Title", "content": ["Some text."]}
+    ]}
+
+    def start(self, workers):
+        from pyposo.server import RenderServer
+
+        server = RenderServer(("127.0.0.1", 0), workers=workers)
+        thread = Thread(target=server.serve_forever)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(thread.join)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def request(self, server, method, path, body=None):
+        connection = http.client.HTTPConnection(*server.server_address)
+        self.addCleanup(connection.close)
+        connection.request(method, path, body)
+        response = connection.getresponse()
+        return response, response.read()
+
+    def test_render(self):
+        server = self.start(workers=0)
+        body = json.dumps(self.spec)
+        response, data = self.request(server, "POST", "/render", body)
+        self.assertEqual(response.status, 200)
+        self.assertEqual(data.decode(), Document(
+            Section("Title", Paragraph("Some text."))
+        ).dump())
+        self.assertEqual(response.getheader("X-Pyposo-Cache"), "miss")
+        self.assertEqual(response.getheader("Transfer-Encoding"), "chunked")
+
+        response, cached = self.request(server, "POST", "/render", body)
+        self.assertEqual(response.getheader("X-Pyposo-Cache"), "hit")
+        self.assertEqual(cached, data)
+
+        response, html = self.request(
+            server, "POST", "/render?format=html", body
+        )
+        self.assertIn(b"<h2>Title</h2>", html)
+
+        response, stats = self.request(server, "GET", "/stats")
+        stats = json.loads(stats)
+        self.assertEqual(stats["requests"], 3)
+        self.assertGreater(stats["mean_latency_ms"], 0)
+        self.assertLess(stats["max_latency_ms"], 10000)
+        self.assertEqual(stats["cache_hits"], 1)
+        self.assertEqual(stats["cache_misses"], 2)
+
+    def test_errors(self):
+        server = self.start(workers=0)
+        for path, body, status in [
+            ("/render", "{", 400),
+            ("/render", "[]", 400),
+            ("/render?format=pdf", "{}", 400),
+            ("/render", '{"type": "Unknown"}', 400),
+            ("/render", json.dumps({"content": [
+                {"type": "LiteralBlock", "path": __file__}
+            ]}), 400),
+            ("/render", json.dumps(
+                {"type": "StreamingDocument", "file": "out.rst"}
+            ), 400),
+            ("/other", "{}", 404),
+        ]:
+            with self.subTest(path=path, body=body):
+                response, data = self.request(server, "POST", path, body)
+                self.assertEqual(response.status, status)
+                self.assertIn("error", json.loads(data))
+        self.assertEqual(server.counters.errors, 7)
+
+    def test_content_length(self):
+        server = self.start(workers=0)
+        for length in [None, "many", "-1"]:
+            with self.subTest(length=length):
+                connection = http.client.HTTPConnection(
+                    *server.server_address, timeout=10
+                )
+                self.addCleanup(connection.close)
+                connection.putrequest("POST", "/render")
+                if length is not None:
+                    connection.putheader("Content-Length", length)
+                connection.endheaders()
+                response = connection.getresponse()
+                self.assertEqual(response.status, 400)
+                self.assertIn("Content-Length", json.loads(response.read())["error"])
+
+    def test_workers(self):
+        server = self.start(workers=1)
+        response, data = self.request(
+            server, "POST", "/render", json.dumps(self.spec)
+        )
+        self.assertEqual(response.status, 200)
+        self.assertTrue(data.startswith(b"Title"))
+
+
+class TestDisplayWidth(TestCase):
+    def test_display_width(self):
+        self.assertEqual(display_width("Title"), 5)
+        self.assertEqual(display_width("日本語"), 6)
+        self.assertEqual(display_width("e\u0301"), 1)
+        self.assertEqual(display_width("😀!"), 3)
+        self.assertEqual(len(Str("日本")), 4)
+
+    def test_title(self):
+        self.assertEqual(Section("日本語").dump(), "日本語\n======\n")
+        self.assertEqual(Title("Ωmega").dump(), "=======\n Ωmega \n=======\n")
+
+    def test_wrapping(self):
+        doc = Document(Paragraph("語" * 25 + " 短い 単語 と 文字"), textwidth=20)
+        lines = doc.dump().splitlines()
+        self.assertEqual(lines[:2], ["語" * 10, "語" * 10])
+        self.assertTrue(all(display_width(line) <= 20 for line in lines))
+        self.assertEqual("".join(lines).replace(" ", ""), "語" * 25 + "短い単語と文字")
+
+        stream = Document(StreamParagraph(["語" * 25 + " 短い 単", "語 と 文字"]), textwidth=20)
+        self.assertEqual(stream.dump(), doc.dump())
+
+    def test_field_list(self):
+        doc = Document(
+            FieldList(FieldListItem("項目", Paragraph("説明 " * 10))),
+            textwidth=30,
+        )
+        lines = doc.dump().strip("\n").splitlines()
+        self.assertTrue(lines[0].startswith(":項目: 説明"))
+        self.assertTrue(all(line.startswith(" " * 7) for line in lines[1:]))
+        self.assertTrue(all(display_width(line) <= 30 for line in lines))